@@ -14,7 +14,7 @@ db = SQLAlchemy()
 # Ініціалізація JWT
 jwt = JWTManager()
 
-def create_app():
+def create_app(test_config=None):
     # Ініціалізація Flask
     app = Flask(__name__)
     
@@ -24,6 +24,24 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev_jwt_key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
+    app.config['EXCHANGE_RATE_API_KEY'] = os.getenv('EXCHANGE_RATE_API_KEY', '')
+    app.config['EXCHANGE_RATE_PROVIDER'] = os.getenv('EXCHANGE_RATE_PROVIDER', 'exchangerate-api')
+    app.config['EXCHANGE_RATE_TTL'] = int(os.getenv('EXCHANGE_RATE_TTL', 3600))
+    app.config['ANALYTICS_CACHE_ENABLED'] = os.getenv('ANALYTICS_CACHE_ENABLED', 'false').lower() == 'true'
+    app.config['ANALYTICS_CACHE_MAX_MB'] = int(os.getenv('ANALYTICS_CACHE_MAX_MB', 64))
+    app.config['IDEMPOTENCY_KEY_TTL_HOURS'] = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    app.config['NOTIFICATION_WEBHOOK_URL'] = os.getenv('NOTIFICATION_WEBHOOK_URL', '')
+    
+    # Перевизначення для тестів (напр. SQLite замість MySQL)
+    if test_config:
+        app.config.update(test_config)
+    
+    # Швидша JSON-серіалізація відповідей, якщо встановлено orjson
+    try:
+        from app.json_provider import OrjsonProvider
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        pass
     
     # Ініціалізація розширень
     db.init_app(app)
@@ -39,6 +57,8 @@ def create_app():
         from app.routes.accounts import accounts_bp
         from app.routes.exchange_rates import exchange_rates_bp
         from app.routes.admin import admin_bp
+        from app.routes.recurring import recurring_bp
+        from app.routes.notifications import notifications_bp
         
         app.register_blueprint(auth_bp, url_prefix='/api/auth')
         app.register_blueprint(transactions_bp, url_prefix='/api/transactions')
@@ -47,8 +67,30 @@ def create_app():
         app.register_blueprint(accounts_bp, url_prefix='/api/accounts')
         app.register_blueprint(exchange_rates_bp, url_prefix='/api/exchange-rates')
         app.register_blueprint(admin_bp, url_prefix='/api/admin')
+        app.register_blueprint(recurring_bp, url_prefix='/api/recurring')
+        app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
+        
+        # Кеш аналітики в пам'яті (опціонально, потребує numpy)
+        from app.services import analytics_cache
+        analytics_cache.init_app(app)
+        
+        # Кеш курсів валют (джерело - EXCHANGE_RATE_PROVIDER)
+        from app.services import exchange_rates
+        exchange_rates.init_app(app)
+        
+        # Сповіщення про пороги бюджетів (перевірка перед кожним commit)
+        from app.services import budget_alerts
+        budget_alerts.init_app(app)
+        
+        # CLI-команди обслуговування
+        from app.commands import register_commands
+        register_commands(app)
         
         # Створення таблиць БД, якщо вони не існують
         db.create_all()
+        
+        # Індекс повнотекстового пошуку для SQLite (на MySQL він у схемі)
+        from app.services.search import init_search_index
+        init_search_index()
     
     return app
\ No newline at end of file
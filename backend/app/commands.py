@@ -0,0 +1,142 @@
+import click
+import time
+
+
+def register_commands(app):
+    """Зареєструвати CLI-команди обслуговування (flask <команда>)"""
+    
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', 'user_ids', type=int, multiple=True,
+                  help='Перерахувати лише вказаних користувачів (можна кілька разів)')
+    def rebuild_rollups(user_ids):
+        """Перерахувати денні підсумки (daily_category_totals) з таблиці transactions"""
+        from app.services import rollups
+        
+        started = time.perf_counter()
+        processed = rollups.rebuild(list(user_ids) or None)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Rebuilt rollups for {processed} users in {elapsed:.2f}s')
+    
+    @app.cli.command('snapshot-balances')
+    @click.option('--account-id', 'account_ids', type=int, multiple=True,
+                  help='Перерахувати лише вказані рахунки (можна кілька разів)')
+    def snapshot_balances(account_ids):
+        """Перерахувати знімки балансів на кінець місяця (ремонт; нові знімки створює перший запис місяця)"""
+        from app.services import balance_history
+        
+        started = time.perf_counter()
+        processed = balance_history.rebuild(list(account_ids) or None)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Rebuilt balance snapshots for {processed} accounts in {elapsed:.2f}s')
+    
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys():
+        """Видалити прострочені ключі ідемпотентності (запускати щодня)"""
+        from app.services.idempotency import purge_expired
+        
+        started = time.perf_counter()
+        deleted = purge_expired()
+        elapsed = time.perf_counter() - started
+        click.echo(f'Purged {deleted} expired idempotency keys in {elapsed:.2f}s')
+    
+    @app.cli.command('run-recurring')
+    @click.option('--date', 'run_date', type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Вважати сьогоднішньою цю дату (за замовчуванням - поточна)')
+    @click.option('--chunk-size', type=int, default=500, show_default=True,
+                  help='Скільки шаблонів обробляти в одній транзакції БД')
+    def run_recurring(run_date, chunk_size):
+        """Створити транзакції з регулярних шаблонів, яким настав час (запускати щодня)"""
+        from app.services.recurring import run_due
+        
+        started = time.perf_counter()
+        processed, created = run_due(run_date.date() if run_date else None, chunk_size)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Materialized {created} transactions from {processed} recurring templates in {elapsed:.2f}s')
+    
+    @app.cli.command('verify-budget-spend')
+    @click.option('--fix', is_flag=True, help='Виправити знайдені розбіжності')
+    @click.option('--chunk-size', type=int, default=1000, show_default=True,
+                  help='Скільки бюджетів звіряти за один запит')
+    def verify_budget_spend(fix, chunk_size):
+        """Звірити лічильники spent бюджетів з транзакціями (і виправити з --fix)"""
+        from app.services.budget_spend import verify
+        
+        started = time.perf_counter()
+        checked, mismatches = verify(fix=fix, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+        for budget_id, spent, expected in mismatches:
+            click.echo(f'Budget {budget_id}: spent {spent}, ledger {expected}')
+        action = 'fixed' if fix else 'found'
+        click.echo(f'Checked {checked} budgets in {elapsed:.2f}s, {action} {len(mismatches)} mismatches')
+    
+    @app.cli.command('drain-notifications')
+    @click.option('--loop', is_flag=True, help='Працювати як фоновий воркер, опитуючи чергу')
+    @click.option('--interval', type=float, default=5.0, show_default=True,
+                  help='Пауза між опитуваннями черги в режимі --loop, секунд')
+    @click.option('--batch-size', type=int, default=100, show_default=True,
+                  help='Скільки сповіщень обробляти в одній транзакції БД')
+    def drain_notifications(loop, interval, batch_size):
+        """Доставити сповіщення з черги (notifications зі status='pending')"""
+        from app.services.notifications import drain
+        
+        while True:
+            started = time.perf_counter()
+            sent, failed = drain(batch_size)
+            elapsed = time.perf_counter() - started
+            if sent or failed or not loop:
+                click.echo(f'Delivered {sent} notifications ({failed} failed attempts) in {elapsed:.2f}s')
+            if not loop:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('forecast-budgets')
+    @click.option('--chunk-size', type=int, default=1000, show_default=True,
+                  help='Скільки користувачів прогнозувати за один запит')
+    def forecast_budgets(chunk_size):
+        """Прорахувати прогнози активних бюджетів усіх користувачів (запускати щоночі)"""
+        from app.services import budget_forecast
+        
+        if not budget_forecast.available():
+            raise click.ClickException('Budget forecasting requires numpy')
+        
+        started = time.perf_counter()
+        users, budgets = budget_forecast.run_nightly(chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Forecast {budgets} budgets for {users} users in {elapsed:.2f}s')
+    
+    @app.cli.command('rollover-budgets')
+    @click.option('--chunk-size', type=int, default=500, show_default=True,
+                  help='Скільки користувачів обробляти в одній транзакції БД')
+    def rollover_budgets(chunk_size):
+        """Створити наступні періоди регулярних бюджетів (запускати щодня)"""
+        from app.services.budget_rollover import rollover
+        
+        started = time.perf_counter()
+        created, skipped = rollover(chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+        rate = created / elapsed if elapsed > 0 else 0
+        click.echo(f'Rolled over {created} budgets ({skipped} skipped as overlapping) '
+                   f'in {elapsed:.2f}s ({rate:.0f} budgets/s)')
+    
+    @app.cli.command('reconcile-balances')
+    @click.option('--fix', is_flag=True, help='Виправити баланси, що розходяться з журналом')
+    @click.option('--workers', type=int, default=4, show_default=True,
+                  help='Скільки порцій звіряти паралельно (окреме з\'єднання на кожну)')
+    @click.option('--chunk-size', type=int, default=1000, show_default=True,
+                  help='Скільки користувачів звіряти одним запитом')
+    def reconcile_balances(fix, workers, chunk_size):
+        """Звірити баланси рахунків із сумою транзакцій (і виправити з --fix)"""
+        from app.services.reconcile import reconcile
+        
+        started = time.perf_counter()
+        total_checked = 0
+        total_mismatches = 0
+        for index, users, checked, mismatches, elapsed in reconcile(app, fix, workers, chunk_size):
+            for account_id, user_id, balance, expected in mismatches:
+                click.echo(f'Account {account_id} (user {user_id}): balance {balance}, ledger {expected}')
+            click.echo(f'Chunk {index}: {users} users, {checked} accounts, {len(mismatches)} mismatches in {elapsed:.2f}s')
+            total_checked += checked
+            total_mismatches += len(mismatches)
+        elapsed = time.perf_counter() - started
+        action = 'fixed' if fix else 'found'
+        click.echo(f'Checked {total_checked} accounts in {elapsed:.2f}s, {action} {total_mismatches} mismatches')
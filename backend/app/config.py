@@ -11,6 +11,12 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev_jwt_key')
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
     EXCHANGE_RATE_API_KEY = os.getenv('EXCHANGE_RATE_API_KEY', '')
+    EXCHANGE_RATE_PROVIDER = os.getenv('EXCHANGE_RATE_PROVIDER', 'exchangerate-api')
+    EXCHANGE_RATE_TTL = int(os.getenv('EXCHANGE_RATE_TTL', 3600))
+    ANALYTICS_CACHE_ENABLED = os.getenv('ANALYTICS_CACHE_ENABLED', 'false').lower() == 'true'
+    ANALYTICS_CACHE_MAX_MB = int(os.getenv('ANALYTICS_CACHE_MAX_MB', 64))
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    NOTIFICATION_WEBHOOK_URL = os.getenv('NOTIFICATION_WEBHOOK_URL', '')
 
 class DevelopmentConfig(Config):
     """Конфігурація для розробки."""
@@ -1,5 +1,9 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.dialects import mysql
+
+# Маркер "значення не передано" для to_dict (None - допустима назва)
+_UNSET = object()
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -56,6 +60,8 @@ class Account(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(50), nullable=False)
     balance = db.Column(db.Numeric(15, 2), default=0)
+    # Баланс на момент створення рахунку: balance має дорівнювати йому плюс сума транзакцій
+    opening_balance = db.Column(db.Numeric(15, 2), nullable=False, default=0, server_default='0')
     currency = db.Column(db.String(3), default='UAH')
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -75,6 +81,10 @@ class Account(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Повнотекстовий пошук за описом (лише MySQL; на SQLite - FTS5, див. services/search.py)
+        db.Index('ft_description', 'description', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -86,13 +96,26 @@ class Transaction(db.Model):
     date = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
+    @staticmethod
+    def with_names(query):
+        """Додати до запиту назви рахунку та категорії через JOIN, щоб списки не робили N+1 lazy loads"""
+        return query.outerjoin(Account, Transaction.account_id == Account.id) \
+            .outerjoin(Category, Transaction.category_id == Category.id) \
+            .add_columns(Account.name, Category.name)
+    
+    def to_dict(self, account_name=_UNSET, category_name=_UNSET):
+        # Якщо назви не передано з JOIN-запиту, беремо їх з relationships
+        if account_name is _UNSET:
+            account_name = self.account.name if self.account else None
+        if category_name is _UNSET:
+            category_name = self.category.name if self.category else None
+        
         return {
             'id': self.id,
             'account_id': self.account_id,
-            'account_name': self.account.name if self.account else None,
+            'account_name': account_name,
             'category_id': self.category_id,
-            'category_name': self.category.name if self.category else None,
+            'category_name': category_name,
             'amount': float(self.amount),
             'description': self.description,
             'transaction_type': self.transaction_type,
@@ -102,6 +125,9 @@ class Transaction(db.Model):
 
 class Budget(db.Model):
     __tablename__ = 'budgets'
+    __table_args__ = (
+        db.Index('idx_recurring_end', 'is_recurring', 'end_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -109,19 +135,169 @@ class Budget(db.Model):
     amount = db.Column(db.Numeric(15, 2), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
+    # Витрати за категорією в межах дат; оновлюється разом із транзакціями (services/budget_spend.py)
+    spent = db.Column(db.Numeric(15, 2), nullable=False, default=0, server_default='0')
+    # Після завершення періоду rollover-budgets створить наступний (і передасть йому прапорець)
+    is_recurring = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
+    @staticmethod
+    def with_category_name(query):
+        """Додати до запиту назву категорії через JOIN, щоб списки не робили N+1 lazy loads"""
+        return query.outerjoin(Category, Budget.category_id == Category.id) \
+            .add_columns(Category.name)
+    
+    def to_dict(self, category_name=_UNSET):
+        if category_name is _UNSET:
+            category_name = self.category.name if self.category else None
+        
         return {
             'id': self.id,
             'category_id': self.category_id,
-            'category_name': self.category.name if self.category else None,
+            'category_name': category_name,
             'amount': float(self.amount),
             'start_date': self.start_date.strftime('%Y-%m-%d'),
             'end_date': self.end_date.strftime('%Y-%m-%d'),
+            'is_recurring': bool(self.is_recurring),
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+class RecurringTransaction(db.Model):
+    """Шаблон регулярної транзакції (оренда, зарплата), який матеріалізує команда run-recurring"""
+    __tablename__ = 'recurring_transactions'
+    __table_args__ = (
+        db.Index('idx_recurring_due', 'is_active', 'next_run'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id', ondelete='CASCADE'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='SET NULL'))
+    amount = db.Column(db.Numeric(15, 2), nullable=False)
+    description = db.Column(db.String(255))
+    transaction_type = db.Column(db.Enum('income', 'expense', 'transfer'), nullable=False)
+    interval_unit = db.Column(db.Enum('day', 'week', 'month', 'year'), nullable=False, default='month')
+    interval_count = db.Column(db.Integer, nullable=False, default=1)
+    # Дата першого повтору: з неї береться день місяця, щоб 31-ше не "з'їжджало" на 28-ме
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date)
+    next_run = db.Column(db.Date, nullable=False)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'category_id': self.category_id,
+            'amount': float(self.amount),
+            'description': self.description,
+            'transaction_type': self.transaction_type,
+            'interval_unit': self.interval_unit,
+            'interval_count': self.interval_count,
+            'start_date': self.start_date.strftime('%Y-%m-%d'),
+            'end_date': self.end_date.strftime('%Y-%m-%d') if self.end_date else None,
+            'next_run': self.next_run.strftime('%Y-%m-%d'),
+            'is_active': self.is_active,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
     
+class BudgetForecast(db.Model):
+    """Прогноз витрат бюджету на end_date, збережений нічним forecast-budgets"""
+    __tablename__ = 'budget_forecasts'
+    
+    budget_id = db.Column(db.Integer, db.ForeignKey('budgets.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    computed_on = db.Column(db.Date, nullable=False)
+    # Версія даних користувача (user_data_versions) на момент розрахунку
+    data_version = db.Column(db.BigInteger, nullable=False)
+    spent = db.Column(db.Numeric(15, 2), nullable=False)
+    daily_rate = db.Column(db.Numeric(15, 2), nullable=False)
+    projected_linear = db.Column(db.Numeric(15, 2), nullable=False)
+    projected_spend = db.Column(db.Numeric(15, 2), nullable=False)
+    overrun_probability = db.Column(db.Float, nullable=False)
+    days_elapsed = db.Column(db.Integer, nullable=False)
+    days_remaining = db.Column(db.Integer, nullable=False)
+    
+class BudgetAlertRule(db.Model):
+    """Поріг сповіщення бюджету у відсотках; is_triggered - чи витрати зараз вище порогу"""
+    __tablename__ = 'budget_alert_rules'
+    
+    budget_id = db.Column(db.Integer, db.ForeignKey('budgets.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    threshold_percent = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    is_triggered = db.Column(db.Boolean, nullable=False, default=False)
+    
+class Notification(db.Model):
+    """Сповіщення користувача; рядки зі status='pending' - черга для drain-notifications"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('idx_notifications_queue', 'status', 'available_at'),
+        db.Index('idx_notifications_user', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    budget_id = db.Column(db.Integer, db.ForeignKey('budgets.id', ondelete='SET NULL'))
+    kind = db.Column(db.String(50), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.Text)
+    status = db.Column(db.Enum('pending', 'sent', 'failed'), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    read_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'budget_id': self.budget_id,
+            'kind': self.kind,
+            'message': self.message,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'is_read': self.read_at is not None
+        }
+    
+class DailyCategoryTotal(db.Model):
+    """Денні підсумки транзакцій користувача за категорією і типом (rollup)"""
+    __tablename__ = 'daily_category_totals'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    # 0 означає "без категорії": NULL не може бути частиною первинного ключа
+    category_id = db.Column(db.Integer, primary_key=True, default=0)
+    transaction_type = db.Column(db.Enum('income', 'expense', 'transfer'), primary_key=True)
+    total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+class AccountBalanceSnapshot(db.Model):
+    """Сума руху по рахунку (доходи - витрати) на кінець місяця для швидкої історії балансу"""
+    __tablename__ = 'account_balance_snapshots'
+    
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    period_end = db.Column(db.Date, primary_key=True)
+    ledger_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    
+class UserDataVersion(db.Model):
+    """Лічильник версії даних користувача; кожен запис його збільшує (для ETag)"""
+    __tablename__ = 'user_data_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    
+class IdempotencyKey(db.Model):
+    """Збережена відповідь на POST з Idempotency-Key (повтор віддає її без виконання запиту)"""
+    __tablename__ = 'idempotency_keys'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    key = db.Column(db.String(255), primary_key=True)
+    # SHA-256 від методу, шляху і тіла запиту: той самий ключ з іншим тілом - помилка клієнта
+    request_hash = db.Column(db.String(64), nullable=False)
+    # NULL поки перший запит ще виконується
+    status_code = db.Column(db.SmallInteger)
+    # Відповідь імпорту з тисячами помилок більша за 64 КБ MySQL TEXT
+    response_body = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'))
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
 class AdminLog(db.Model):
     __tablename__ = 'admin_logs'
     
@@ -2,30 +2,103 @@ from flask import Blueprint, request, jsonify
 from app.models import Account
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.etag import etag_cached, bump
+from app.services.idempotency import idempotent
+from app.services import rollups, balance_history, analytics_cache, budget_spend
+from app.services.serialization import parse_fields, select_columns, ACCOUNT_FIELDS
+from app.services import exchange_rates
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
 accounts_bp = Blueprint('accounts', __name__)
 
 @accounts_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_cached
 def get_accounts():
     user_id = int(get_jwt_identity())
     
     # Отримання параметрів фільтрації
     is_active = request.args.get('is_active', type=lambda v: v.lower() == 'true')
     
-    query = Account.query.filter_by(user_id=user_id)
+    try:
+        fields = parse_fields(request.args.get('fields'), ACCOUNT_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Вибираємо лише колонки запитаних полів, без ORM-об'єктів
+    columns, serialize = select_columns(ACCOUNT_FIELDS, fields)
+    query = db.session.query(*columns).filter(Account.user_id == user_id)
     
     if is_active is not None:
-        query = query.filter_by(is_active=is_active)
+        query = query.filter(Account.is_active == is_active)
+    
+    return jsonify({
+        'accounts': [serialize(row) for row in query.order_by(Account.id)]
+    }), 200
+
+@accounts_bp.route('/net-worth', methods=['GET'])
+@jwt_required()
+def get_net_worth():
+    user_id = int(get_jwt_identity())
+    currency = request.args.get('currency', exchange_rates.RATES_BASE).upper()
+    if len(currency) != 3 or not currency.isalpha():
+        return jsonify({'error': f'Unsupported currency: {currency}'}), 400
     
-    accounts = query.all()
+    # Курси - з кешу процесу, без запиту до зовнішнього API на кожен виклик
+    try:
+        table = exchange_rates.get_table()
+    except exchange_rates.RatesUnavailable:
+        table = None
+    if table is not None and currency not in table.rates:
+        return jsonify({'error': f'Unsupported currency: {currency}'}), 400
+    
+    # Баланси активних рахунків по валютах - один GROUP BY
+    rows = db.session.query(
+        Account.currency,
+        db.func.sum(Account.balance),
+        db.func.count(Account.id)
+    ).filter(
+        Account.user_id == user_id,
+        Account.is_active.is_(True)
+    ).group_by(Account.currency).all()
+    
+    total = Decimal('0')
+    by_currency = []
+    unconverted = []
+    for row_currency, balance, count in rows:
+        balance = Decimal(str(balance or 0))
+        rate = converted = None
+        if row_currency == currency:
+            rate, converted = Decimal('1'), balance
+        elif table is not None:
+            try:
+                converted, rate = exchange_rates.convert(balance, row_currency, currency, table)
+            except ValueError:
+                pass
+        if converted is None:
+            unconverted.append(row_currency)
+        else:
+            total += converted
+        by_currency.append({
+            'currency': row_currency,
+            'balance': float(balance),
+            'accounts': count,
+            'rate': float(exchange_rates.quantize_rate(rate)) if rate is not None else None,
+            'converted': float(converted) if converted is not None else None
+        })
     
     return jsonify({
-        'accounts': [a.to_dict() for a in accounts]
+        'currency': currency,
+        'total': float(total),
+        'by_currency': by_currency,
+        'unconverted': unconverted,
+        'rates_fetched_at': table.fetched_at.strftime('%Y-%m-%d %H:%M:%S') if table else None
     }), 200
 
 @accounts_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_account():
     user_id = get_jwt_identity()
     data = request.get_json()
@@ -39,11 +112,13 @@ def create_account():
         user_id=user_id,
         name=data['name'],
         balance=data.get('balance', 0),
+        opening_balance=data.get('balance', 0),
         currency=data.get('currency', 'UAH'),
         is_active=data.get('is_active', True)
     )
     
     db.session.add(new_account)
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
@@ -65,6 +140,52 @@ def get_account(account_id):
         'account': account.to_dict()
     }), 200
 
+@accounts_bp.route('/<int:account_id>/balance-history', methods=['GET'])
+@jwt_required()
+def get_balance_history(account_id):
+    user_id = int(get_jwt_identity())
+    
+    account = Account.query.filter_by(id=account_id, user_id=user_id).first()
+    
+    if not account:
+        return jsonify({'error': 'Account not found'}), 404
+    
+    # Баланс на конкретну дату (на кінець дня)
+    at = request.args.get('at')
+    if at:
+        try:
+            day = datetime.strptime(at, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid at format. Use YYYY-MM-DD'}), 400
+        
+        return jsonify({
+            'account_id': account.id,
+            'date': day.strftime('%Y-%m-%d'),
+            'balance': float(balance_history.balance_at(account, day))
+        }), 200
+    
+    # Історія за період (за замовчуванням - останні 30 днів)
+    try:
+        end = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else datetime.now().date()
+        start = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    if end < start:
+        return jsonify({'error': 'End date must be after start date'}), 400
+    
+    opening_balance, points = balance_history.history(account, start, end)
+    
+    return jsonify({
+        'account_id': account.id,
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'opening_balance': opening_balance,
+        'history': points
+    }), 200
+
 @accounts_bp.route('/<int:account_id>', methods=['PUT'])
 @jwt_required()
 def update_account(account_id):
@@ -81,7 +202,24 @@ def update_account(account_id):
         account.name = data['name']
     
     if 'balance' in data:
-        account.balance = data['balance']
+        try:
+            balance = Decimal(str(data['balance']))
+        except InvalidOperation:
+            return jsonify({'error': 'Invalid balance'}), 400
+        if not balance.is_finite() or abs(balance) > Decimal('9999999999999.99'):
+            return jsonify({'error': 'Invalid balance'}), 400
+        
+        # Ручна правка - це зміна балансу поза журналом: opening_balance зсувається
+        # на ту саму різницю, інакше reconcile-balances --fix скасує правку.
+        # Порядок SET важливий для MySQL: opening_balance рахується зі старого balance
+        table = Account.__table__
+        db.session.execute(
+            table.update().where(table.c.id == account.id).ordered_values(
+                (table.c.opening_balance, table.c.opening_balance + (balance - table.c.balance)),
+                (table.c.balance, balance)
+            )
+        )
+        db.session.expire(account, ['balance', 'opening_balance'])
     
     if 'currency' in data:
         account.currency = data['currency']
@@ -89,6 +227,7 @@ def update_account(account_id):
     if 'is_active' in data:
         account.is_active = data['is_active']
     
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
@@ -107,6 +246,13 @@ def delete_account(account_id):
         return jsonify({'error': 'Account not found'}), 404
     
     db.session.delete(account)
+    bump(user_id)
+    analytics_cache.invalidate(user_id)
+    db.session.commit()
+    
+    # Разом з рахунком видалено його транзакції - перераховуємо підсумки користувача
+    rollups.rebuild([int(user_id)])
+    budget_spend.refresh(user_id=user_id)
     db.session.commit()
     
     return jsonify({
@@ -191,14 +191,19 @@ def get_user_details(user_id):
         user_data['categories'] = [cat.to_dict() for cat in categories]
         
         # Останні транзакції
-        transactions = Transaction.query.filter_by(user_id=user_id).order_by(
+        transactions = Transaction.with_names(
+            Transaction.query.filter_by(user_id=user_id)
+        ).order_by(
             Transaction.date.desc()
         ).limit(10).all()
-        user_data['recent_transactions'] = [t.to_dict() for t in transactions]
+        user_data['recent_transactions'] = [
+            t.to_dict(account_name=account_name, category_name=category_name)
+            for t, account_name, category_name in transactions
+        ]
         
         # Бюджети
-        budgets = Budget.query.filter_by(user_id=user_id).all()
-        user_data['budgets'] = [b.to_dict() for b in budgets]
+        budgets = Budget.with_category_name(Budget.query.filter_by(user_id=user_id)).all()
+        user_data['budgets'] = [b.to_dict(category_name=category_name) for b, category_name in budgets]
         
         log_admin_action('VIEW_USER_DETAILS', 'user', user_id)
         
@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
-from app.models import Budget, Category, Transaction
+from app.models import Budget, Category, BudgetAlertRule
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.etag import etag_cached, bump
+from app.services.idempotency import idempotent
 from datetime import datetime, timedelta
+from app.services import budget_spend, budget_alerts, budget_forecast
+from app.services.budget_spend import budget_dicts, budget_dict
 
 budgets_bp = Blueprint('budgets', __name__)
 
 @budgets_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_cached
 def get_budgets():
     user_id = int(get_jwt_identity())
     
@@ -49,37 +54,49 @@ def get_budgets():
                 )
             )
     
-    budgets = query.order_by(Budget.start_date.desc()).all()
+    rows = Budget.with_category_name(query).order_by(Budget.start_date.desc()).all()
     
-    # Розширюємо інформацію про бюджети
+    # Витрати вже лежать у лічильнику spent - звичайне читання без агрегації
+    result = budget_dicts(
+        [budget for budget, _ in rows],
+        [category_name for _, category_name in rows]
+    )
+    
+    return jsonify({
+        'budgets': result
+    }), 200
+
+@budgets_bp.route('/forecast', methods=['GET'])
+@jwt_required()
+@etag_cached
+def get_budget_forecast():
+    user_id = int(get_jwt_identity())
+    
+    if not budget_forecast.available():
+        return jsonify({'error': 'Budget forecasting requires numpy'}), 503
+    
+    # Прогноз на end_date для всіх активних сьогодні бюджетів одним розрахунком
+    forecasts = budget_forecast.forecast_user(user_id)
+    
+    budgets = Budget.query.filter(Budget.id.in_(list(forecasts))).all() if forecasts else []
     result = []
-    for budget in budgets:
-        budget_dict = budget.to_dict()
-        
-        # Знаходимо суму витрат по категорії в рамках періоду бюджету
-        spent_query = Transaction.query.filter_by(
-            user_id=user_id,
+    for budget in sorted(budgets, key=lambda b: b.end_date):
+        forecast = forecasts[budget.id]
+        result.append(dict(
+            forecast,
+            budget_id=budget.id,
             category_id=budget.category_id,
-            transaction_type='expense'
-        ).filter(
-            Transaction.date >= datetime.combine(budget.start_date, datetime.min.time()),
-            Transaction.date <= datetime.combine(budget.end_date, datetime.max.time())
-        )
-        
-        spent = sum(float(t.amount) for t in spent_query.all())
-        
-        budget_dict['spent'] = spent
-        budget_dict['remaining'] = float(budget.amount) - spent
-        budget_dict['percent'] = (spent / float(budget.amount)) * 100 if float(budget.amount) > 0 else 0
-        
-        result.append(budget_dict)
+            amount=float(budget.amount),
+            end_date=budget.end_date.strftime('%Y-%m-%d')
+        ))
     
     return jsonify({
-        'budgets': result
+        'forecasts': result
     }), 200
 
 @budgets_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_budget():
     user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -142,32 +159,21 @@ def create_budget():
             category_id=category_id,
             amount=amount,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            is_recurring=bool(data.get('is_recurring', False))
         )
         
         db.session.add(new_budget)
+        db.session.flush()
+        # Початкове значення лічильника - з денних підсумків за період бюджету
+        budget_spend.refresh([new_budget])
+        budget_alerts.set_rules(new_budget)
+        bump(user_id)
         db.session.commit()
         
-        # Розрахунок витрат для відповіді
-        spent_query = Transaction.query.filter_by(
-            user_id=user_id,
-            category_id=new_budget.category_id,
-            transaction_type='expense'
-        ).filter(
-            Transaction.date >= datetime.combine(new_budget.start_date, datetime.min.time()),
-            Transaction.date <= datetime.combine(new_budget.end_date, datetime.max.time())
-        )
-        
-        spent = sum(float(t.amount) for t in spent_query.all())
-        
-        budget_dict = new_budget.to_dict()
-        budget_dict['spent'] = spent
-        budget_dict['remaining'] = float(new_budget.amount) - spent
-        budget_dict['percent'] = (spent / float(new_budget.amount)) * 100 if float(new_budget.amount) > 0 else 0
-        
         return jsonify({
             'message': 'Budget created successfully',
-            'budget': budget_dict
+            'budget': budget_dict(new_budget)
         }), 201
         
     except ValueError:
@@ -183,25 +189,8 @@ def get_budget(budget_id):
     if not budget:
         return jsonify({'error': 'Budget not found'}), 404
     
-    # Розрахунок витрат
-    spent_query = Transaction.query.filter_by(
-        user_id=user_id,
-        category_id=budget.category_id,
-        transaction_type='expense'
-    ).filter(
-        Transaction.date >= datetime.combine(budget.start_date, datetime.min.time()),
-        Transaction.date <= datetime.combine(budget.end_date, datetime.max.time())
-    )
-    
-    spent = sum(float(t.amount) for t in spent_query.all())
-    
-    budget_dict = budget.to_dict()
-    budget_dict['spent'] = spent
-    budget_dict['remaining'] = float(budget.amount) - spent
-    budget_dict['percent'] = (spent / float(budget.amount)) * 100 if float(budget.amount) > 0 else 0
-    
     return jsonify({
-        'budget': budget_dict
+        'budget': budget_dict(budget)
     }), 200
 
 @budgets_bp.route('/<int:budget_id>', methods=['PUT'])
@@ -254,32 +243,22 @@ def update_budget(budget_id):
         except ValueError:
             return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
     
+    if 'is_recurring' in data:
+        budget.is_recurring = bool(data['is_recurring'])
+    
     # Валідація дат після всіх змін
     if budget.end_date <= budget.start_date:
         return jsonify({'error': 'End date must be after start date'}), 400
     
+    # Категорія чи дати могли змінитися - лічильник перераховується з денних підсумків
+    db.session.flush()
+    budget_spend.refresh([budget])
+    bump(user_id)
     db.session.commit()
     
-    # Розрахунок витрат для відповіді
-    spent_query = Transaction.query.filter_by(
-        user_id=user_id,
-        category_id=budget.category_id,
-        transaction_type='expense'
-    ).filter(
-        Transaction.date >= datetime.combine(budget.start_date, datetime.min.time()),
-        Transaction.date <= datetime.combine(budget.end_date, datetime.max.time())
-    )
-    
-    spent = sum(float(t.amount) for t in spent_query.all())
-    
-    budget_dict = budget.to_dict()
-    budget_dict['spent'] = spent
-    budget_dict['remaining'] = float(budget.amount) - spent
-    budget_dict['percent'] = (spent / float(budget.amount)) * 100 if float(budget.amount) > 0 else 0
-    
     return jsonify({
         'message': 'Budget updated successfully',
-        'budget': budget_dict
+        'budget': budget_dict(budget)
     }), 200
 
 @budgets_bp.route('/<int:budget_id>', methods=['DELETE'])
@@ -293,8 +272,55 @@ def delete_budget(budget_id):
         return jsonify({'error': 'Budget not found'}), 404
     
     db.session.delete(budget)
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
         'message': 'Budget deleted successfully'
-    }), 200
\ No newline at end of file
+    }), 200
+
+@budgets_bp.route('/<int:budget_id>/alerts', methods=['GET'])
+@jwt_required()
+def get_budget_alerts(budget_id):
+    user_id = int(get_jwt_identity())
+    
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+    if not budget:
+        return jsonify({'error': 'Budget not found'}), 404
+    
+    rules = BudgetAlertRule.query.filter_by(budget_id=budget.id) \
+        .order_by(BudgetAlertRule.threshold_percent).all()
+    
+    return jsonify({
+        'thresholds': [rule.threshold_percent for rule in rules]
+    }), 200
+
+@budgets_bp.route('/<int:budget_id>/alerts', methods=['PUT'])
+@jwt_required()
+def update_budget_alerts(budget_id):
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+    if not budget:
+        return jsonify({'error': 'Budget not found'}), 404
+    
+    thresholds = data.get('thresholds') if isinstance(data, dict) else None
+    if not isinstance(thresholds, list):
+        return jsonify({'error': 'Missing required field: thresholds'}), 400
+    try:
+        thresholds = sorted({int(t) for t in thresholds})
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Thresholds must be integers'}), 400
+    if any(t < 1 or t > 1000 for t in thresholds):
+        return jsonify({'error': 'Thresholds must be between 1 and 1000 percent'}), 400
+    
+    # Нові правила одразу звіряються з поточними витратами (перед commit),
+    # тож уже перевищений поріг дасть одне сповіщення
+    budget_alerts.set_rules(budget, thresholds)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Budget alerts updated successfully',
+        'thresholds': thresholds
+    }), 200
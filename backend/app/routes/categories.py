@@ -2,30 +2,41 @@ from flask import Blueprint, request, jsonify
 from app.models import Category
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.etag import etag_cached, bump
+from app.services.idempotency import idempotent
+from app.services import rollups
+from app.services.serialization import parse_fields, select_columns, CATEGORY_FIELDS
 
 categories_bp = Blueprint('categories', __name__)
 
 @categories_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_cached
 def get_categories():
     user_id = int(get_jwt_identity())  # Конвертуємо в int
     
     # Фільтрація за типом (доходи/витрати)
     category_type = request.args.get('type')
     
-    query = Category.query.filter_by(user_id=user_id)
+    try:
+        fields = parse_fields(request.args.get('fields'), CATEGORY_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if category_type:
-        query = query.filter_by(type=category_type)
+    # Вибираємо лише колонки запитаних полів, без ORM-об'єктів
+    columns, serialize = select_columns(CATEGORY_FIELDS, fields)
+    query = db.session.query(*columns).filter(Category.user_id == user_id)
     
-    categories = query.all()
+    if category_type:
+        query = query.filter(Category.type == category_type)
     
     return jsonify({
-        'categories': [cat.to_dict() for cat in categories]
+        'categories': [serialize(row) for row in query.order_by(Category.id)]
     }), 200
 
 @categories_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_category():
     user_id = int(get_jwt_identity())  # Конвертуємо в int
     data = request.get_json()
@@ -47,6 +58,7 @@ def create_category():
     )
     
     db.session.add(new_category)
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
@@ -91,6 +103,7 @@ def update_category(category_id):
     # if 'type' in data:
     #     category.type = data['type']
     
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
@@ -109,7 +122,11 @@ def delete_category(category_id):
     if not category:
         return jsonify({'error': 'Category not found'}), 404
     
+    # Транзакції категорії стають "без категорії" - так само і їхні підсумки
+    rollups.reassign_category(user_id, category_id)
+    
     db.session.delete(category)
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
@@ -1,61 +1,68 @@
 from flask import Blueprint, request, jsonify
-import requests
-import os
-from datetime import datetime
 from flask_jwt_extended import jwt_required
+from app.services import exchange_rates
 
 exchange_rates_bp = Blueprint('exchange_rates', __name__)
 
+def _table_info(table):
+    return {
+        'timestamp': table.updated_at,
+        'fetched_at': table.fetched_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'stale': table.is_stale
+    }
+
 @exchange_rates_bp.route('', methods=['GET'])
 @jwt_required()
 def get_exchange_rates():
     # Отримання параметрів
-    base_currency = request.args.get('base', 'UAH')
+    base_currency = request.args.get('base', 'UAH').upper()
     target_currency = request.args.get('target', 'USD,EUR,GBP')
     
-    # API ключ з змінних оточення
-    api_key = os.getenv('EXCHANGE_RATE_API_KEY')
-    
-    if not api_key:
-        return jsonify({
-            'error': 'Exchange Rate API key is not configured'
-        }), 500
-    
-    # Запит до зовнішнього API
-    url = f"https://v6.exchangerate-api.com/v6/{api_key}/latest/{base_currency}"
-    
+    # Курси з кешу процесу: до зовнішнього API звертаємося не частіше за TTL
     try:
-        response = requests.get(url)
-        data = response.json()
-        
-        if data['result'] != 'success':
-            return jsonify({
-                'error': 'Failed to fetch exchange rates',
-                'details': data.get('error-type', 'Unknown error')
-            }), 500
-        
-        # Фільтрація результатів за запитаними валютами
-        target_currencies = target_currency.split(',')
-        filtered_rates = {currency: rate for currency, rate in data['conversion_rates'].items() if currency in target_currencies}
-        
+        table = exchange_rates.get_table(base_currency)
+    except exchange_rates.UnsupportedCurrency as e:
         return jsonify({
-            'base_currency': base_currency,
-            'rates': filtered_rates,
-            'timestamp': data.get('time_last_update_unix', int(datetime.now().timestamp()))
-        }), 200
-        
-    except Exception as e:
+            'error': 'Failed to fetch exchange rates',
+            'details': str(e)
+        }), 400
+    except exchange_rates.RatesUnavailable as e:
         return jsonify({
             'error': 'Failed to fetch exchange rates',
             'details': str(e)
         }), 500
+    
+    # Фільтрація результатів за запитаними валютами
+    target_currencies = target_currency.upper().split(',')
+    filtered_rates = {currency: float(rate) for currency, rate in table.rates.items() if currency in target_currencies}
+    
+    result = {
+        'base_currency': base_currency,
+        'rates': filtered_rates
+    }
+    result.update(_table_info(table))
+    return jsonify(result), 200
+
+def _conversion(amount, from_currency, to_currency, table):
+    converted, rate = exchange_rates.convert(amount, from_currency, to_currency, table)
+    return {
+        'from': {
+            'currency': from_currency,
+            'amount': float(amount)
+        },
+        'to': {
+            'currency': to_currency,
+            'amount': float(converted)
+        },
+        'rate': float(exchange_rates.quantize_rate(rate))
+    }
 
 @exchange_rates_bp.route('/convert', methods=['GET'])
 @jwt_required()
 def convert_currency():
     # Отримання параметрів
-    from_currency = request.args.get('from', 'UAH')
-    to_currency = request.args.get('to', 'USD')
+    from_currency = request.args.get('from', 'UAH').upper()
+    to_currency = request.args.get('to', 'USD').upper()
     amount = request.args.get('amount')
     
     if not amount:
@@ -64,48 +71,72 @@ def convert_currency():
         }), 400
     
     try:
-        amount = float(amount)
-    except ValueError:
+        amount = exchange_rates.parse_amount(amount)
+    except ValueError as e:
         return jsonify({
-            'error': 'Amount must be a number'
+            'error': str(e)
         }), 400
     
-    # API ключ з змінних оточення
-    api_key = os.getenv('EXCHANGE_RATE_API_KEY')
-    
-    if not api_key:
+    # Одна таблиця відносно базової валюти: будь-яка пара - крос-курс через неї,
+    # тож конвертація - це множення без запиту до API
+    try:
+        table = exchange_rates.get_table()
+    except exchange_rates.RatesUnavailable as e:
         return jsonify({
-            'error': 'Exchange Rate API key is not configured'
+            'error': 'Failed to convert currency',
+            'details': str(e)
         }), 500
     
-    # Запит до зовнішнього API
-    url = f"https://v6.exchangerate-api.com/v6/{api_key}/pair/{from_currency}/{to_currency}/{amount}"
-    
     try:
-        response = requests.get(url)
-        data = response.json()
-        
-        if data['result'] != 'success':
-            return jsonify({
-                'error': 'Failed to convert currency',
-                'details': data.get('error-type', 'Unknown error')
-            }), 500
-        
+        result = _conversion(amount, from_currency, to_currency, table)
+    except ValueError as e:
         return jsonify({
-            'from': {
-                'currency': from_currency,
-                'amount': amount
-            },
-            'to': {
-                'currency': to_currency,
-                'amount': data['conversion_result']
-            },
-            'rate': data['conversion_rate'],
-            'timestamp': data.get('time_last_update_unix', int(datetime.now().timestamp()))
-        }), 200
-        
-    except Exception as e:
+            'error': 'Failed to convert currency',
+            'details': str(e)
+        }), 400
+    
+    result.update(_table_info(table))
+    return jsonify(result), 200
+
+@exchange_rates_bp.route('/convert/batch', methods=['POST'])
+@jwt_required()
+def convert_currency_batch():
+    data = request.get_json(silent=True) or {}
+    
+    # {"items": [{"amount": 100, "from": "USD", "to": "EUR"}, ...]}
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing required field: items'}), 400
+    
+    if len(items) > exchange_rates.MAX_BATCH_CONVERSIONS:
+        return jsonify({'error': f'Too many items. Maximum is {exchange_rates.MAX_BATCH_CONVERSIONS}'}), 413
+    
+    try:
+        table = exchange_rates.get_table()
+    except exchange_rates.RatesUnavailable as e:
         return jsonify({
             'error': 'Failed to convert currency',
             'details': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+    
+    # Помилка в одному елементі не зупиняє решту
+    results = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or 'amount' not in item:
+            results.append({'index': index, 'status': 'error', 'error': 'Amount is required'})
+            continue
+        try:
+            amount = exchange_rates.parse_amount(item['amount'])
+            from_currency = str(item.get('from', 'UAH')).upper()
+            to_currency = str(item.get('to', 'USD')).upper()
+            result = _conversion(amount, from_currency, to_currency, table)
+        except ValueError as e:
+            results.append({'index': index, 'status': 'error', 'error': str(e)})
+            continue
+        results.append(dict(result, index=index, status='converted'))
+    
+    response = {
+        'results': results
+    }
+    response.update(_table_info(table))
+    return jsonify(response), 200
@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+from app.models import Notification
+from app import db
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+
+notifications_bp = Blueprint('notifications', __name__)
+
+@notifications_bp.route('', methods=['GET'])
+@jwt_required()
+def get_notifications():
+    user_id = int(get_jwt_identity())
+    
+    unread = request.args.get('unread', type=lambda v: v.lower() == 'true')
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    
+    # Показуємо лише вже оброблені чергою сповіщення
+    query = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.status == 'sent'
+    )
+    if unread:
+        query = query.filter(Notification.read_at.is_(None))
+    
+    notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
+    
+    return jsonify({
+        'notifications': [n.to_dict() for n in notifications]
+    }), 200
+
+@notifications_bp.route('/<int:notification_id>/read', methods=['PUT'])
+@jwt_required()
+def mark_read(notification_id):
+    user_id = int(get_jwt_identity())
+    
+    notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
+    if not notification:
+        return jsonify({'error': 'Notification not found'}), 404
+    
+    if notification.read_at is None:
+        notification.read_at = datetime.utcnow()
+        db.session.commit()
+    
+    return jsonify({
+        'notification': notification.to_dict()
+    }), 200
@@ -0,0 +1,161 @@
+from flask import Blueprint, request, jsonify
+from app.models import RecurringTransaction, Account, Category
+from app import db
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.etag import etag_cached, bump
+from app.services.idempotency import idempotent
+from app.services.recurring import INTERVAL_UNITS
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+recurring_bp = Blueprint('recurring', __name__)
+
+def _apply_fields(template, data, user_id):
+    """Перевірити і записати поля шаблону з JSON. Повертає (повідомлення, код) або None"""
+    if 'account_id' in data:
+        account = Account.query.filter_by(id=data['account_id'], user_id=user_id).first()
+        if not account:
+            return 'Account not found', 404
+        template.account_id = account.id
+    
+    if 'category_id' in data:
+        category_id = data['category_id']
+        if category_id:
+            category = Category.query.filter_by(id=category_id, user_id=user_id).first()
+            if not category:
+                return 'Category not found', 404
+            template.category_id = category.id
+        else:
+            template.category_id = None
+    
+    if 'amount' in data:
+        try:
+            amount = Decimal(str(data['amount']))
+        except InvalidOperation:
+            return 'Invalid amount', 400
+        if not amount.is_finite() or amount <= 0:
+            return 'Amount must be greater than zero', 400
+        template.amount = amount
+    
+    if 'transaction_type' in data:
+        if data['transaction_type'] not in ['income', 'expense', 'transfer']:
+            return 'Transaction type must be "income", "expense", or "transfer"', 400
+        template.transaction_type = data['transaction_type']
+    
+    if 'interval_unit' in data:
+        if data['interval_unit'] not in INTERVAL_UNITS:
+            return f"Interval unit must be one of: {', '.join(INTERVAL_UNITS)}", 400
+        template.interval_unit = data['interval_unit']
+    
+    if 'interval_count' in data:
+        try:
+            interval_count = int(data['interval_count'])
+        except (ValueError, TypeError):
+            return 'Invalid interval_count', 400
+        if interval_count < 1:
+            return 'Interval count must be at least 1', 400
+        template.interval_count = interval_count
+    
+    if 'description' in data:
+        template.description = data['description'] or ''
+    
+    if 'is_active' in data:
+        template.is_active = bool(data['is_active'])
+    
+    try:
+        if 'start_date' in data:
+            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+            if start_date != template.start_date:
+                # Розклад починається з нового початку, але не раніше за вже
+                # створені повтори (next_run > start_date - шаблон уже виконувався)
+                has_run = template.next_run is not None and template.next_run > template.start_date
+                template.next_run = max(template.next_run, start_date) if has_run else start_date
+                template.start_date = start_date
+        if 'end_date' in data:
+            template.end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data['end_date'] else None
+    except ValueError:
+        return 'Invalid date format. Use YYYY-MM-DD', 400
+    
+    if template.end_date and template.end_date < template.start_date:
+        return 'End date must not be before start date', 400
+    
+    return None
+
+@recurring_bp.route('', methods=['GET'])
+@jwt_required()
+@etag_cached
+def get_recurring():
+    user_id = int(get_jwt_identity())
+    
+    templates = RecurringTransaction.query.filter_by(user_id=user_id) \
+        .order_by(RecurringTransaction.next_run).all()
+    
+    return jsonify({
+        'recurring': [t.to_dict() for t in templates]
+    }), 200
+
+@recurring_bp.route('', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_recurring():
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    
+    # Перевірка наявності необхідних полів
+    if not all(k in data for k in ('account_id', 'amount', 'transaction_type', 'interval_unit', 'start_date')):
+        return jsonify({'error': 'Missing required fields: account_id, amount, transaction_type, interval_unit, start_date'}), 400
+    
+    template = RecurringTransaction(user_id=user_id, interval_count=1, is_active=True)
+    error = _apply_fields(template, data, user_id)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+    
+    db.session.add(template)
+    bump(user_id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Recurring transaction created successfully',
+        'recurring': template.to_dict()
+    }), 201
+
+@recurring_bp.route('/<int:recurring_id>', methods=['PUT'])
+@jwt_required()
+def update_recurring(recurring_id):
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    
+    template = RecurringTransaction.query.filter_by(id=recurring_id, user_id=user_id).first()
+    if not template:
+        return jsonify({'error': 'Recurring transaction not found'}), 404
+    
+    error = _apply_fields(template, data, user_id)
+    if error:
+        db.session.rollback()
+        return jsonify({'error': error[0]}), error[1]
+    
+    bump(user_id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Recurring transaction updated successfully',
+        'recurring': template.to_dict()
+    }), 200
+
+@recurring_bp.route('/<int:recurring_id>', methods=['DELETE'])
+@jwt_required()
+def delete_recurring(recurring_id):
+    user_id = int(get_jwt_identity())
+    
+    template = RecurringTransaction.query.filter_by(id=recurring_id, user_id=user_id).first()
+    if not template:
+        return jsonify({'error': 'Recurring transaction not found'}), 404
+    
+    # Вже створені транзакції залишаються - видаляється лише розклад
+    db.session.delete(template)
+    bump(user_id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Recurring transaction deleted successfully'
+    }), 200
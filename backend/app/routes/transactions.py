@@ -1,59 +1,182 @@
-from flask import Blueprint, request, jsonify
-from app.models import Transaction, Category, Account
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import csv
+from app.models import Transaction, Category, Account, DailyCategoryTotal
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.etag import etag_cached, bump
+from app.services.idempotency import idempotent
 from datetime import datetime
 from sqlalchemy import func
-from decimal import Decimal
+from app.services.pagination import encode_cursor, decode_cursor, parse_limit
+from app.services import rollups
+from app.services.search import apply_search
+from app.services.serialization import parse_fields, transaction_columns, TRANSACTION_FIELDS
+from app.services import analytics_cache
+from app.services.sql import period_bucket, GRANULARITIES
+from app.services.balances import signed_amount, apply_delta
+from app.services import balance_history
+from app.services.transaction_import import read_rows, import_transactions, MAX_IMPORT_ROWS
+from app.services.transaction_export import stream_export, FORMATS, EXPORT_BATCH_SIZE
+from app.services.transaction_batch import run_batch, MAX_BATCH_OPERATIONS
 
 transactions_bp = Blueprint('transactions', __name__)
 
-@transactions_bp.route('', methods=['GET'])
-@jwt_required()
-def get_transactions():
-    user_id = int(get_jwt_identity())
+def apply_filters(query, args):
+    """Застосувати фільтри списку транзакцій з параметрів запиту.
     
+    Піднімає ValueError з текстом помилки для некоректних дат.
+    """
     # Отримання параметрів фільтрації
-    category_id = request.args.get('category_id', type=int)
-    account_id = request.args.get('account_id', type=int)
-    transaction_type = request.args.get('type')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    query = Transaction.query.filter_by(user_id=user_id)
+    category_id = args.get('category_id', type=int)
+    account_id = args.get('account_id', type=int)
+    transaction_type = args.get('type')
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    search = args.get('q')
     
     # Застосування фільтрів
     if category_id:
-        query = query.filter_by(category_id=category_id)
+        query = query.filter(Transaction.category_id == category_id)
     
     if account_id:
-        query = query.filter_by(account_id=account_id)
+        query = query.filter(Transaction.account_id == account_id)
     
     if transaction_type:
-        query = query.filter_by(transaction_type=transaction_type)
+        query = query.filter(Transaction.transaction_type == transaction_type)
     
     if start_date:
         try:
             start = datetime.strptime(start_date, '%Y-%m-%d')
-            query = query.filter(Transaction.date >= start)
         except ValueError:
-            return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
+            raise ValueError('Invalid start_date format. Use YYYY-MM-DD')
+        query = query.filter(Transaction.date >= start)
     
     if end_date:
         try:
             end = datetime.strptime(end_date, '%Y-%m-%d')
-            query = query.filter(Transaction.date <= end)
         except ValueError:
-            return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
+            raise ValueError('Invalid end_date format. Use YYYY-MM-DD')
+        query = query.filter(Transaction.date <= end)
+    
+    if search:
+        query = apply_search(query, search)
+    
+    return query
+
+@transactions_bp.route('', methods=['GET'])
+@jwt_required()
+@etag_cached
+def get_transactions():
+    user_id = int(get_jwt_identity())
+    
+    # Розріджений набір полів (fields=id,amount,date): вибираємо лише потрібні
+    # колонки без ORM-об'єктів і JOIN-имо назви лише коли їх запитано
+    try:
+        fields = parse_fields(request.args.get('fields'), TRANSACTION_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    columns, joins, serialize = transaction_columns(fields)
+    query = db.session.query(*columns).filter(Transaction.user_id == user_id)
+    if joins['account']:
+        query = query.outerjoin(Account, Transaction.account_id == Account.id)
+    if joins['category']:
+        query = query.outerjoin(Category, Transaction.category_id == Category.id)
     
-    transactions = query.order_by(Transaction.date.desc()).all()
+    try:
+        query = apply_filters(query, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Keyset-пагінація за (date, id): кожна сторінка - це діапазонне сканування
+    # індексу idx_user_date (InnoDB неявно додає id у кінець вторинного індексу),
+    # тому сторінка N коштує стільки ж, скільки перша, на відміну від OFFSET
+    limit = parse_limit(request.args.get('limit', type=int))
+    cursor = request.args.get('cursor')
+    
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(
+            db.or_(
+                Transaction.date < cursor_date,
+                db.and_(Transaction.date == cursor_date, Transaction.id < cursor_id)
+            )
+        )
+    
+    # Вибираємо на один рядок більше, щоб дізнатися, чи є наступна сторінка
+    rows = query.order_by(
+        Transaction.date.desc(),
+        Transaction.id.desc()
+    ).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id, last_date = rows[-1][0], rows[-1][1]
+        next_cursor = encode_cursor(last_date, last_id)
     
     return jsonify({
-        'transactions': [t.to_dict() for t in transactions]
+        'transactions': [serialize(row) for row in rows],
+        'next_cursor': next_cursor
     }), 200
 
+@transactions_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_transactions():
+    user_id = int(get_jwt_identity())
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'Format must be "csv" or "ndjson"'}), 400
+    compress = request.args.get('gzip', 'false').lower() in ('1', 'true')
+    
+    # Лише колонки, без ORM-об'єктів; назви - через JOIN
+    query = db.session.query(
+        Transaction.id,
+        Transaction.date,
+        Transaction.transaction_type,
+        Transaction.amount,
+        Transaction.account_id,
+        Account.name,
+        Transaction.category_id,
+        Category.name,
+        Transaction.description
+    ).outerjoin(
+        Account, Transaction.account_id == Account.id
+    ).outerjoin(
+        Category, Transaction.category_id == Category.id
+    ).filter(Transaction.user_id == user_id)
+    
+    try:
+        query = apply_filters(query, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # yield_per вмикає серверний (небуферизований) курсор - на PyMySQL це SSCursor,
+    # тому пам'ять не росте з розміром експорту
+    result = query.order_by(
+        Transaction.date.desc(),
+        Transaction.id.desc()
+    ).yield_per(EXPORT_BATCH_SIZE)
+    
+    mimetype, extension = FORMATS[fmt]
+    filename = f'transactions.{extension}'
+    if compress:
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    
+    return Response(
+        stream_with_context(stream_export(result, fmt, compress)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 @transactions_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_transaction():
     user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -86,6 +209,9 @@ def create_transaction():
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
+    # Знімок за минулий місяць - до змін, з уже збережених даних
+    balance_history.ensure_snapshots([account.id])
+    
     # Створення нової транзакції
     new_transaction = Transaction(
         user_id=user_id,
@@ -98,21 +224,70 @@ def create_transaction():
     )
     
     db.session.add(new_transaction)
+    rollups.add_transaction(new_transaction)
     
-    # Оновлення балансу рахунку - ВИКОРИСТОВУЄМО DECIMAL
-    amount = Decimal(str(data['amount']))
-    if data['transaction_type'] == 'income':
-        account.balance = account.balance + amount
-    elif data['transaction_type'] == 'expense':
-        account.balance = account.balance - amount
+    # Оновлення балансу рахунку атомарно в БД - ВИКОРИСТОВУЄМО DECIMAL
+    effect = signed_amount(data['transaction_type'], data['amount'])
+    balance = apply_delta(account.id, effect)
+    balance_history.adjust(account.id, transaction_date, effect)
     
+    bump(user_id)
     db.session.commit()
     
     return jsonify({
         'message': 'Transaction created successfully',
-        'transaction': new_transaction.to_dict()
+        'transaction': new_transaction.to_dict(),
+        'account_balance': float(balance)
     }), 201
 
+@transactions_bp.route('/import', methods=['POST'])
+@jwt_required()
+@idempotent
+def import_transactions_bulk():
+    user_id = int(get_jwt_identity())
+    
+    # JSON-масив (або {"transactions": [...]}) чи CSV з тими ж колонками
+    try:
+        rows = read_rows(request)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e) or 'Invalid import payload'}), 400
+    
+    if not rows:
+        return jsonify({'error': 'No transactions to import'}), 400
+    
+    if len(rows) > MAX_IMPORT_ROWS:
+        return jsonify({'error': f'Too many rows. Maximum is {MAX_IMPORT_ROWS}'}), 413
+    
+    imported, errors = import_transactions(user_id, rows)
+    
+    return jsonify({
+        'message': 'Import finished',
+        'imported': imported,
+        'failed': len(errors),
+        'errors': errors
+    }), 200
+
+@transactions_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_transactions():
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    
+    # {"operations": [{"op": "update", "id": 1, "category_id": 5}, {"op": "delete", "id": 2}]}
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Missing required field: operations'}), 400
+    
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'Too many operations. Maximum is {MAX_BATCH_OPERATIONS}'}), 413
+    
+    results = run_batch(user_id, operations)
+    
+    return jsonify({
+        'message': 'Batch processed',
+        'results': results
+    }), 200
+
 @transactions_bp.route('/<int:transaction_id>', methods=['GET'])
 @jwt_required()
 def get_transaction(transaction_id):
@@ -138,8 +313,14 @@ def update_transaction(transaction_id):
     if not transaction:
         return jsonify({'error': 'Transaction not found'}), 404
     
-    old_amount = Decimal(str(transaction.amount))
+    balance_history.ensure_snapshots([transaction.account_id])
+    
+    old_effect = signed_amount(transaction.transaction_type, transaction.amount)
     old_type = transaction.transaction_type
+    old_date = transaction.date
+    
+    # Прибираємо стару версію з денних підсумків; нову додамо після змін
+    rollups.remove_transaction(transaction)
     
     # Оновлення полів
     if 'amount' in data:
@@ -163,34 +344,37 @@ def update_transaction(transaction_id):
         else:
             transaction.category_id = None
     
-    # Оновлення балансу рахунку при зміні суми або типу
+    # Оновлення балансу рахунку при зміні суми або типу: одна атомарна
+    # зміна на різницю між новим і старим впливом транзакції
+    balance = None
     if 'amount' in data or 'transaction_type' in data:
-        account = Account.query.filter_by(id=transaction.account_id).first()
-        
-        # Відміна старої транзакції
-        if old_type == 'income':
-            account.balance = account.balance - old_amount
-        elif old_type == 'expense':
-            account.balance = account.balance + old_amount
-        
-        # Застосування нової транзакції
         new_type = data.get('transaction_type', old_type)
-        new_amount = Decimal(str(data.get('amount', old_amount)))
+        new_effect = signed_amount(new_type, transaction.amount)
         
-        if new_type == 'income':
-            account.balance = account.balance + new_amount
-        elif new_type == 'expense':
-            account.balance = account.balance - new_amount
+        balance = apply_delta(transaction.account_id, new_effect - old_effect)
         
         if 'transaction_type' in data:
             transaction.transaction_type = new_type
     
+    # Знімки балансу: прибрати старий вплив на старій даті, додати новий на новій
+    new_effect = signed_amount(transaction.transaction_type, transaction.amount)
+    if (old_date, old_effect) != (transaction.date, new_effect):
+        balance_history.adjust(transaction.account_id, old_date, -old_effect)
+        balance_history.adjust(transaction.account_id, transaction.date, new_effect)
+    
+    rollups.add_transaction(transaction)
+    
+    bump(user_id)
     db.session.commit()
     
-    return jsonify({
+    response = {
         'message': 'Transaction updated successfully',
         'transaction': transaction.to_dict()
-    }), 200
+    }
+    if balance is not None:
+        response['account_balance'] = float(balance)
+    
+    return jsonify(response), 200
 
 @transactions_bp.route('/<int:transaction_id>', methods=['DELETE'])
 @jwt_required()
@@ -202,24 +386,77 @@ def delete_transaction(transaction_id):
     if not transaction:
         return jsonify({'error': 'Transaction not found'}), 404
     
-    # Оновлення балансу рахунку
-    account = Account.query.filter_by(id=transaction.account_id).first()
-    if account:
-        amount = Decimal(str(transaction.amount))
-        if transaction.transaction_type == 'income':
-            account.balance = account.balance - amount
-        elif transaction.transaction_type == 'expense':
-            account.balance = account.balance + amount
+    balance_history.ensure_snapshots([transaction.account_id])
     
+    # Оновлення балансу рахунку (атомарно, без читання рахунку)
+    effect = signed_amount(transaction.transaction_type, transaction.amount)
+    balance = apply_delta(transaction.account_id, -effect)
+    balance_history.adjust(transaction.account_id, transaction.date, -effect)
+    
+    rollups.remove_transaction(transaction)
     db.session.delete(transaction)
+    bump(user_id)
     db.session.commit()
     
-    return jsonify({
+    response = {
         'message': 'Transaction deleted successfully'
-    }), 200
+    }
+    if balance is not None:
+        response['account_balance'] = float(balance)
+    
+    return jsonify(response), 200
+
+def _rollup_summary_rows(user_id, start, end):
+    """Рядки (тип, категорія, назва, колір, сума) з денних підсумків"""
+    # Читаємо денні підсумки замість сирих транзакцій: вартість залежить від
+    # кількості днів і категорій у діапазоні, а не від кількості транзакцій
+    query = db.session.query(
+        DailyCategoryTotal.transaction_type,
+        DailyCategoryTotal.category_id,
+        Category.name,
+        Category.color,
+        func.sum(DailyCategoryTotal.total)
+    ).outerjoin(
+        Category, DailyCategoryTotal.category_id == Category.id
+    ).filter(DailyCategoryTotal.user_id == user_id)
+    
+    if start:
+        query = query.filter(DailyCategoryTotal.day >= start)
+    
+    if end:
+        query = query.filter(DailyCategoryTotal.day <= end)
+    
+    return query.group_by(
+        DailyCategoryTotal.transaction_type,
+        DailyCategoryTotal.category_id,
+        Category.name,
+        Category.color
+    ).having(func.sum(DailyCategoryTotal.count) > 0).all()
+
+def _cached_summary_rows(user_id, start, end):
+    """Ті самі рядки з кешу аналітики; з БД читаються лише назви категорій"""
+    totals = analytics_cache.category_totals(user_id, start, end)
+    
+    category_ids = {category_id for _, category_id, _ in totals if category_id}
+    categories = {
+        c.id: c for c in Category.query.filter(Category.id.in_(category_ids))
+    } if category_ids else {}
+    
+    rows = []
+    for transaction_type, category_id, amount in totals:
+        category = categories.get(category_id)
+        rows.append((
+            transaction_type,
+            category_id,
+            category.name if category else None,
+            category.color if category else None,
+            amount
+        ))
+    return rows
 
 @transactions_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@etag_cached
 def get_summary():
     user_id = int(get_jwt_identity())
     
@@ -227,58 +464,122 @@ def get_summary():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
-    query = Transaction.query.filter_by(user_id=user_id)
-    
-    if start_date:
-        try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            query = query.filter(Transaction.date >= start)
-        except ValueError:
-            return jsonify({'error': 'Invalid start_date format'}), 400
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    except ValueError:
+        return jsonify({'error': 'Invalid start_date format'}), 400
     
-    if end_date:
-        try:
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            query = query.filter(Transaction.date <= end)
-        except ValueError:
-            return jsonify({'error': 'Invalid end_date format'}), 400
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Invalid end_date format'}), 400
     
-    transactions = query.all()
+    if analytics_cache.enabled():
+        rows = _cached_summary_rows(user_id, start, end)
+    else:
+        rows = _rollup_summary_rows(user_id, start, end)
     
-    total_income = sum(float(t.amount) for t in transactions if t.transaction_type == 'income')
-    total_expense = sum(float(t.amount) for t in transactions if t.transaction_type == 'expense')
-    balance = total_income - total_expense
+    total_income = 0
+    total_expense = 0
     
     # Групування за категоріями
-    categories_summary = {}
-    for transaction in transactions:
-        category_name = transaction.category.name if transaction.category else 'Без категорії'
-        category_id = transaction.category_id if transaction.category else 0
-        category_color = transaction.category.color if transaction.category else '#808080'
+    categories_summary = {'income': [], 'expense': []}
+    for transaction_type, category_id, category_name, category_color, amount in rows:
+        amount = float(amount or 0)
+        
+        if transaction_type == 'income':
+            total_income += amount
+        elif transaction_type == 'expense':
+            total_expense += amount
+        else:
+            continue
         
-        if transaction.transaction_type not in categories_summary:
-            categories_summary[transaction.transaction_type] = {}
-            
-        if category_id not in categories_summary[transaction.transaction_type]:
-            categories_summary[transaction.transaction_type][category_id] = {
-                'id': category_id,
-                'name': category_name,
-                'color': category_color,
-                'amount': 0
-            }
-            
-        categories_summary[transaction.transaction_type][category_id]['amount'] += float(transaction.amount)
-    
-    # Перетворення словників у списки
-    income_categories = list(categories_summary.get('income', {}).values())
-    expense_categories = list(categories_summary.get('expense', {}).values())
+        categories_summary[transaction_type].append({
+            'id': category_id if category_name is not None else 0,
+            'name': category_name if category_name is not None else 'Без категорії',
+            'color': category_color if category_name is not None else '#808080',
+            'amount': amount
+        })
+    
+    balance = total_income - total_expense
     
     return jsonify({
         'summary': {
             'total_income': total_income,
             'total_expense': total_expense,
             'balance': balance,
-            'income_categories': income_categories,
-            'expense_categories': expense_categories
+            'income_categories': categories_summary['income'],
+            'expense_categories': categories_summary['expense']
         }
-    }), 200
\ No newline at end of file
+    }), 200
+
+@transactions_bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+@etag_cached
+def get_timeseries():
+    user_id = int(get_jwt_identity())
+    
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': 'Granularity must be "day", "week", "month" or "year"'}), 400
+    
+    category_id = request.args.get('category_id', type=int)
+    account_id = request.args.get('account_id', type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    except ValueError:
+        return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
+    
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
+    
+    if analytics_cache.enabled():
+        data = analytics_cache.timeseries(user_id, granularity, start, end, category_id, account_id)
+    else:
+        data = _sql_timeseries(user_id, granularity, start, end, category_id, account_id)
+    
+    # Компактний формат: масив масивів [період, доходи, витрати]
+    return jsonify({
+        'granularity': granularity,
+        'columns': ['period', 'income', 'expense'],
+        'data': data
+    }), 200
+
+def _sql_timeseries(user_id, granularity, start, end, category_id, account_id):
+    bucket = period_bucket(Transaction.date, granularity)
+    
+    # Один GROUP BY по idx_user_type_date: по рядку на період, доходи і
+    # витрати рахуються умовними SUM без вибірки окремих транзакцій
+    query = db.session.query(
+        bucket,
+        func.sum(db.case((Transaction.transaction_type == 'income', Transaction.amount), else_=0)),
+        func.sum(db.case((Transaction.transaction_type == 'expense', Transaction.amount), else_=0))
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.transaction_type.in_(('income', 'expense'))
+    )
+    
+    if category_id:
+        query = query.filter(Transaction.category_id == category_id)
+    
+    if account_id:
+        query = query.filter(Transaction.account_id == account_id)
+    
+    if start:
+        query = query.filter(Transaction.date >= datetime.combine(start, datetime.min.time()))
+    
+    if end:
+        # Кінцева дата включно (до кінця дня)
+        query = query.filter(Transaction.date <= datetime.combine(end, datetime.max.time()))
+    
+    rows = query.group_by(bucket).order_by(bucket).all()
+    
+    return [
+        [str(period), float(income or 0), float(expense or 0)]
+        for period, income, expense in rows
+    ]
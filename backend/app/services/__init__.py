@@ -0,0 +1 @@
+# Спільна бізнес-логіка, яку використовують кілька blueprints
@@ -0,0 +1,283 @@
+import threading
+from app import db
+from app.models import Transaction
+from app.services.etag import current_version
+from collections import Counter, OrderedDict
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необов'язкова залежність
+    np = None
+
+TYPE_CODES = {'income': 0, 'expense': 1, 'transfer': 2}
+
+_EPOCH = date(1970, 1, 1)
+
+# Активний кеш процесу; None, якщо вимкнений (ANALYTICS_CACHE_ENABLED)
+_cache = None
+
+
+def _day_number(value):
+    if hasattr(value, 'date'):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def _cents(amount):
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def _row(transaction):
+    """Стовпчикове представлення транзакції"""
+    return (
+        transaction.id,
+        _day_number(transaction.date),
+        _cents(transaction.amount),
+        transaction.category_id or 0,
+        transaction.account_id,
+        TYPE_CODES[transaction.transaction_type]
+    )
+
+
+class UserColumns:
+    """Транзакції одного користувача у вигляді компактних NumPy-стовпців"""
+    
+    __slots__ = ('version', 'ids', 'days', 'cents', 'categories', 'accounts', 'types')
+    
+    def __init__(self, version, rows):
+        self.version = version
+        self._set(rows)
+    
+    def _set(self, rows):
+        ids, days, cents, categories, accounts, types = zip(*rows) if rows else ((),) * 6
+        self.ids = np.array(ids, dtype=np.int64)
+        self.days = np.array(days, dtype=np.int64)
+        self.cents = np.array(cents, dtype=np.int64)
+        self.categories = np.array(categories, dtype=np.int32)
+        self.accounts = np.array(accounts, dtype=np.int32)
+        self.types = np.array(types, dtype=np.int8)
+    
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__[1:])
+    
+    def applied(self, version, removed_ids, added_rows):
+        """Нова копія стовпців без рядків removed_ids і з added_rows (оновлення = видалення + вставка).
+        
+        Поточний екземпляр не змінюється: читачі, які вже отримали його з кешу,
+        працюють з цілісним знімком.
+        """
+        result = UserColumns.__new__(UserColumns)
+        result.version = version
+        keep = ~np.isin(self.ids, np.fromiter(removed_ids, dtype=np.int64)) if removed_ids else None
+        added = UserColumns(None, added_rows) if added_rows else None
+        for name in self.__slots__[1:]:
+            column = getattr(self, name)
+            if keep is not None:
+                column = column[keep]
+            if added is not None:
+                column = np.concatenate((column, getattr(added, name)))
+            setattr(result, name, column)
+        return result
+    
+    def mask(self, start=None, end=None, category_id=None, account_id=None):
+        """Булева маска рядків за діапазоном днів [start, end] і фільтрами"""
+        mask = np.ones(self.ids.shape, dtype=bool)
+        if start is not None:
+            mask &= self.days >= _day_number(start)
+        if end is not None:
+            mask &= self.days <= _day_number(end)
+        if category_id:
+            mask &= self.categories == category_id
+        if account_id:
+            mask &= self.accounts == account_id
+        return mask
+
+
+class AnalyticsCache:
+    """LRU-кеш стовпців по користувачах з обмеженням пам'яті.
+    
+    Актуальність перевіряється версією даних користувача (user_data_versions):
+    зміни з цього процесу застосовуються інкрементально після commit, а запис
+    з іншого процесу дає розбіжність версії і повне перезавантаження.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def _store(self, user_id, entry):
+        old = self._entries.pop(user_id, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[user_id] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+    
+    def get(self, user_id):
+        version = current_version(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(user_id)
+                return entry
+        
+        rows = db.session.query(
+            Transaction.id,
+            Transaction.date,
+            Transaction.amount,
+            Transaction.category_id,
+            Transaction.account_id,
+            Transaction.transaction_type
+        ).filter(Transaction.user_id == user_id).all()
+        entry = UserColumns(version, [
+            (row_id, _day_number(row_date), _cents(amount), category_id or 0, account_id, TYPE_CODES[transaction_type])
+            for row_id, row_date, amount, category_id, account_id, transaction_type in rows
+        ])
+        
+        with self._lock:
+            self._store(user_id, entry)
+        return entry
+    
+    def apply_commit(self, changes, bumps, invalidated):
+        with self._lock:
+            for user_id in invalidated:
+                old = self._entries.pop(user_id, None)
+                if old is not None:
+                    self._bytes -= old.nbytes
+            
+            for user_id, count in bumps.items():
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    continue
+                removed, added = changes.get(user_id, (set(), {}))
+                # Новий знімок замість зміни спільного екземпляра на місці
+                self._store(user_id, entry.applied(entry.version + count, removed, list(added.values())))
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def _pending(session):
+    return session.info.setdefault('analytics_changes', {})
+
+
+def _record_upsert(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    removed, added = _pending(session).setdefault(target.user_id, (set(), {}))
+    removed.add(target.id)
+    added[target.id] = _row(target)
+
+
+def _record_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    removed, added = _pending(session).setdefault(target.user_id, (set(), {}))
+    removed.add(target.id)
+    added.pop(target.id, None)
+
+
+def _after_commit(session):
+    changes = session.info.pop('analytics_changes', {})
+    bumps = session.info.pop('bumped_users', Counter())
+    invalidated = session.info.pop('analytics_invalidate', set())
+    if _cache is not None and (bumps or invalidated):
+        _cache.apply_commit(changes, bumps, invalidated)
+
+
+def _after_rollback(session, previous_transaction):
+    for key in ('analytics_changes', 'bumped_users', 'analytics_invalidate'):
+        session.info.pop(key, None)
+
+
+def init_app(app):
+    """Увімкнути кеш, якщо ANALYTICS_CACHE_ENABLED і встановлено numpy"""
+    global _cache
+    
+    if not app.config.get('ANALYTICS_CACHE_ENABLED'):
+        return
+    if np is None:
+        app.logger.warning('Analytics cache is enabled but numpy is not installed; cache disabled')
+        return
+    
+    _cache = AnalyticsCache(int(app.config.get('ANALYTICS_CACHE_MAX_MB', 64)) * 1024 * 1024)
+    
+    event.listen(Transaction, 'after_insert', _record_upsert)
+    event.listen(Transaction, 'after_update', _record_upsert)
+    event.listen(Transaction, 'after_delete', _record_delete)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_soft_rollback', _after_rollback)
+
+
+def enabled():
+    return _cache is not None
+
+
+def invalidate(user_id):
+    """Скинути кеш користувача після commit (для записів в обхід ORM, напр. пакетних INSERT)"""
+    db.session.info.setdefault('analytics_invalidate', set()).add(int(user_id))
+
+
+# ============================================================================
+# Агрегації (векторизовані маски і bincount)
+# ============================================================================
+
+def category_totals(user_id, start=None, end=None):
+    """Суми за (тип, категорія) за дні [start, end]: список (type, category_id, amount)"""
+    columns = _cache.get(user_id)
+    mask = columns.mask(start, end)
+    result = []
+    for transaction_type in ('income', 'expense'):
+        selected = mask & (columns.types == TYPE_CODES[transaction_type])
+        if not selected.any():
+            continue
+        keys, inverse = np.unique(columns.categories[selected], return_inverse=True)
+        sums = np.bincount(inverse, weights=columns.cents[selected])
+        for category_id, cents in zip(keys.tolist(), sums.tolist()):
+            result.append((transaction_type, category_id, cents / 100))
+    return result
+
+
+def _period_starts(days, granularity):
+    if granularity == 'day':
+        return days.astype('datetime64[D]')
+    if granularity == 'week':
+        # 1970-01-01 - четвер; понеділок = 0
+        return (days - (days + 3) % 7).astype('datetime64[D]')
+    if granularity == 'month':
+        return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]')
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype('datetime64[D]')
+
+
+def timeseries(user_id, granularity, start=None, end=None, category_id=None, account_id=None):
+    """[[початок періоду, доходи, витрати], ...] за зростанням періоду"""
+    columns = _cache.get(user_id)
+    selected = columns.mask(start, end, category_id, account_id) & (columns.types != TYPE_CODES['transfer'])
+    if not selected.any():
+        return []
+    
+    periods, inverse = np.unique(_period_starts(columns.days[selected], granularity), return_inverse=True)
+    cents = columns.cents[selected]
+    is_income = columns.types[selected] == TYPE_CODES['income']
+    income = np.bincount(inverse, weights=np.where(is_income, cents, 0), minlength=len(periods))
+    expense = np.bincount(inverse, weights=np.where(is_income, 0, cents), minlength=len(periods))
+    
+    return [
+        [str(period), inc / 100, exp / 100]
+        for period, inc, exp in zip(periods.tolist(), income.tolist(), expense.tolist())
+    ]
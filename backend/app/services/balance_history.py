@@ -0,0 +1,193 @@
+import calendar
+from app import db
+from app.models import Transaction, AccountBalanceSnapshot
+from app.services.sql import period_bucket, insert_ignore
+from app.services.balances import signed_amount_sql
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func
+
+# Скільки рахунків перераховувати за одну транзакцію БД під час rebuild
+SNAPSHOT_CHUNK_SIZE = 200
+
+
+def month_end(day):
+    """Останній день місяця для дати"""
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _next_month_end(day):
+    return month_end(day + timedelta(days=1))
+
+
+def _end_of_day(day):
+    return datetime.combine(day, datetime.max.time())
+
+
+def adjust(account_id, when, delta):
+    """Врахувати зміну руху delta на дату when у всіх знімках, що її покривають.
+    
+    Викликається в тій самій транзакції БД, що й запис транзакції, у тому числі
+    для заднім числом внесених чи перенесених у часі транзакцій.
+    """
+    if not delta:
+        return
+    table = AccountBalanceSnapshot.__table__
+    db.session.execute(
+        table.update().where(
+            table.c.account_id == account_id,
+            table.c.period_end >= when.date()
+        ).values(ledger_total=table.c.ledger_total + delta)
+    )
+
+
+def ensure_snapshots(account_ids, today=None):
+    """Створити знімок за минулий місяць для рахунків, у яких його ще немає.
+    
+    Викликається на шляху запису до змін у транзакціях, тож перший запис місяця
+    фіксує знімок з уже збережених даних, а adjust() далі веде його сам.
+    Так історія спирається на знімок не старший за місяць без повного rebuild.
+    """
+    account_ids = sorted(set(account_ids))
+    if not account_ids:
+        return
+    period_end = (today or date.today()).replace(day=1) - timedelta(days=1)
+    
+    existing = {
+        account_id for (account_id,) in db.session.query(AccountBalanceSnapshot.account_id).filter(
+            AccountBalanceSnapshot.account_id.in_(account_ids),
+            AccountBalanceSnapshot.period_end == period_end
+        )
+    }
+    rows = [
+        {'account_id': account_id, 'period_end': period_end, 'ledger_total': _ledger_through(account_id, period_end)}
+        for account_id in account_ids if account_id not in existing
+    ]
+    if rows:
+        insert_ignore(AccountBalanceSnapshot.__table__, rows)
+
+
+def rebuild(account_ids=None, chunk_size=SNAPSHOT_CHUNK_SIZE, until=None):
+    """Перерахувати знімки на кінець кожного завершеного місяця з транзакцій (ремонт).
+    
+    Рахунки обробляються порціями з commit після кожної. Повертає кількість рахунків.
+    """
+    until = until or (date.today().replace(day=1) - timedelta(days=1))
+    
+    if account_ids is None:
+        account_ids = [row[0] for row in db.session.query(Transaction.account_id).distinct()]
+    account_ids = sorted(set(account_ids))
+    
+    table = AccountBalanceSnapshot.__table__
+    bucket = period_bucket(Transaction.date, 'month')
+    
+    for i in range(0, len(account_ids), chunk_size):
+        chunk = account_ids[i:i + chunk_size]
+        
+        db.session.execute(table.delete().where(table.c.account_id.in_(chunk)))
+        
+        # Рух по місяцях для всієї порції одним запитом
+        monthly = {}
+        for account_id, month_start, total in db.session.query(
+            Transaction.account_id, bucket, func.sum(signed_amount_sql())
+        ).filter(
+            Transaction.account_id.in_(chunk),
+            Transaction.date <= _end_of_day(until)
+        ).group_by(Transaction.account_id, bucket):
+            monthly[(account_id, month_end(date.fromisoformat(str(month_start))))] = Decimal(str(total or 0))
+        
+        # Накопичувальні суми без пропусків місяців, щоб найближчий знімок
+        # завжди був не далі ніж за місяць
+        rows = []
+        for account_id in chunk:
+            months = sorted(end for (acc, end) in monthly if acc == account_id)
+            if not months:
+                continue
+            running = Decimal('0')
+            period_end = months[0]
+            while period_end <= until:
+                running += monthly.get((account_id, period_end), Decimal('0'))
+                rows.append({'account_id': account_id, 'period_end': period_end, 'ledger_total': running})
+                period_end = _next_month_end(period_end)
+        
+        if rows:
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+    
+    return len(account_ids)
+
+
+def _nearest_snapshot(account_id, before):
+    """Останній знімок з period_end < before (або None)"""
+    return AccountBalanceSnapshot.query.filter(
+        AccountBalanceSnapshot.account_id == account_id,
+        AccountBalanceSnapshot.period_end < before
+    ).order_by(AccountBalanceSnapshot.period_end.desc()).first()
+
+
+def _ledger_through(account_id, day):
+    """Рух по рахунку до кінця дня day: знімок + транзакції після нього (обмежено місяцем)"""
+    snapshot = _nearest_snapshot(account_id, day + timedelta(days=1))
+    query = db.session.query(func.sum(signed_amount_sql())).filter(
+        Transaction.account_id == account_id,
+        Transaction.date <= _end_of_day(day)
+    )
+    base = Decimal('0')
+    if snapshot:
+        base = Decimal(str(snapshot.ledger_total))
+        query = query.filter(Transaction.date > _end_of_day(snapshot.period_end))
+    return base + Decimal(str(query.scalar() or 0))
+
+
+def _opening_offset(account):
+    """Баланс рахунку поза журналом (початковий баланс і ручні правки)"""
+    ledger_now = _ledger_through(account.id, date.max - timedelta(days=1))
+    return Decimal(str(account.balance or 0)) - ledger_now
+
+
+def balance_at(account, day):
+    """Баланс рахунку на кінець дня day"""
+    return _opening_offset(account) + _ledger_through(account.id, day)
+
+
+def history(account, start, end):
+    """Баланс на початок періоду і біжучий баланс після кожної транзакції в [start, end].
+    
+    Сканує лише транзакції від найближчого знімка до кінця періоду, а біжучу
+    суму рахує віконна функція SUM() OVER (ORDER BY date, id).
+    """
+    snapshot = _nearest_snapshot(account.id, start)
+    base = Decimal(str(snapshot.ledger_total)) if snapshot else Decimal('0')
+    offset = _opening_offset(account)
+    
+    running = func.sum(signed_amount_sql()).over(order_by=(Transaction.date, Transaction.id))
+    query = db.session.query(
+        Transaction.id,
+        Transaction.date,
+        Transaction.transaction_type,
+        Transaction.amount,
+        running
+    ).filter(
+        Transaction.account_id == account.id,
+        Transaction.date <= _end_of_day(end)
+    )
+    if snapshot:
+        query = query.filter(Transaction.date > _end_of_day(snapshot.period_end))
+    
+    opening = offset + base
+    points = []
+    start_at = datetime.combine(start, datetime.min.time())
+    for row_id, row_date, transaction_type, amount, total in query.order_by(Transaction.date, Transaction.id):
+        balance = offset + base + Decimal(str(total or 0))
+        if row_date < start_at:
+            opening = balance
+            continue
+        points.append({
+            'id': row_id,
+            'date': row_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'transaction_type': transaction_type,
+            'amount': float(amount),
+            'balance': float(balance)
+        })
+    
+    return float(opening), points
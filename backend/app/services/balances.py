@@ -0,0 +1,45 @@
+from app import db
+from app.models import Account, Transaction
+from decimal import Decimal
+
+
+def signed_amount(transaction_type, amount):
+    """Вплив транзакції на баланс рахунку: дохід +, витрата -, переказ 0"""
+    amount = Decimal(str(amount))
+    if transaction_type == 'income':
+        return amount
+    if transaction_type == 'expense':
+        return -amount
+    return Decimal('0')
+
+
+def signed_amount_sql():
+    """SQL-вираз впливу транзакції на баланс: дохід +, витрата -, переказ 0"""
+    return db.case(
+        (Transaction.transaction_type == 'income', Transaction.amount),
+        (Transaction.transaction_type == 'expense', -Transaction.amount),
+        else_=0
+    )
+
+
+def apply_delta(account_id, delta):
+    """Атомарно змінити баланс в БД (UPDATE ... SET balance = balance + :delta).
+    
+    Без читання в Python немає втрачених оновлень при паралельних записах.
+    Повертає новий баланс або None, якщо рахунку не існує.
+    """
+    table = Account.__table__
+    stmt = table.update().where(
+        table.c.id == account_id
+    ).values(balance=table.c.balance + delta)
+    
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(stmt.returning(table.c.balance)).scalar()
+    
+    # MySQL не підтримує RETURNING: рядок уже заблоковано нашим UPDATE,
+    # тож читання в тій самій транзакції бачить узгоджене значення
+    if not db.session.execute(stmt).rowcount:
+        return None
+    return db.session.execute(
+        db.select(table.c.balance).where(table.c.id == account_id)
+    ).scalar()
@@ -0,0 +1,148 @@
+from app import db
+from app.models import Budget, BudgetAlertRule, Category, Notification
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import json
+
+# Пороги, які отримує кожен новий бюджет
+DEFAULT_THRESHOLDS = (80, 100)
+
+
+def _touched(session):
+    return session.info.setdefault('budget_touched', {'days': {}, 'budgets': set(), 'users': set()})
+
+
+def touch(user_id, category_id, day):
+    """Запам'ятати, що витрати категорії змінилися на дату day (перевірка - перед commit)"""
+    days = _touched(db.session)['days']
+    key = (int(user_id), int(category_id))
+    low, high = days.get(key, (day, day))
+    days[key] = (min(low, day), max(high, day))
+
+
+def touch_budgets(budget_ids=(), user_id=None):
+    """Запам'ятати бюджети, чий spent перераховано цілком"""
+    touched = _touched(db.session)
+    touched['budgets'].update(budget_ids)
+    if user_id is not None:
+        touched['users'].add(int(user_id))
+
+
+def set_rules(budget, thresholds=DEFAULT_THRESHOLDS):
+    """Замінити пороги сповіщень бюджету"""
+    BudgetAlertRule.query.filter_by(budget_id=budget.id).delete()
+    for threshold in sorted(set(thresholds)):
+        db.session.add(BudgetAlertRule(budget_id=budget.id, threshold_percent=threshold, is_triggered=False))
+    touch_budgets([budget.id])
+
+
+def add_default_rules(budget_ids):
+    """Пороги за замовчуванням для пакетно створених бюджетів"""
+    rows = [
+        {'budget_id': budget_id, 'threshold_percent': threshold, 'is_triggered': False}
+        for budget_id in budget_ids
+        for threshold in DEFAULT_THRESHOLDS
+    ]
+    if rows:
+        db.session.execute(db.insert(BudgetAlertRule), rows)
+    touch_budgets(budget_ids)
+
+
+def evaluate(session):
+    """Перевірити правила лише тих бюджетів, яких стосувалися записи цієї транзакції БД.
+    
+    Сповіщення створюється тільки при перетині порогу знизу вгору; коли
+    витрати знову падають нижче (видалення, перенесення), правило скидається
+    і зможе спрацювати ще раз. Сповіщення лише ставиться в чергу
+    (notifications, status='pending') - доставку виконує drain-notifications.
+    """
+    touched = session.info.pop('budget_touched', None)
+    if not touched:
+        return
+    
+    conditions = [
+        db.and_(
+            Budget.user_id == user_id,
+            Budget.category_id == category_id,
+            Budget.start_date <= high,
+            Budget.end_date >= low
+        )
+        for (user_id, category_id), (low, high) in touched['days'].items()
+    ]
+    if touched['budgets']:
+        conditions.append(Budget.id.in_(touched['budgets']))
+    if touched['users']:
+        conditions.append(Budget.user_id.in_(touched['users']))
+    if not conditions:
+        return
+    
+    rows = session.execute(
+        db.select(
+            BudgetAlertRule.budget_id,
+            BudgetAlertRule.threshold_percent,
+            BudgetAlertRule.is_triggered,
+            Budget.user_id,
+            Budget.amount,
+            Budget.spent,
+            Category.name
+        ).join(
+            Budget, Budget.id == BudgetAlertRule.budget_id
+        ).outerjoin(
+            Category, Category.id == Budget.category_id
+        ).where(db.or_(*conditions))
+    ).all()
+    
+    rules = BudgetAlertRule.__table__
+    notifications = []
+    now = datetime.utcnow()
+    for budget_id, threshold, is_triggered, user_id, amount, spent, category_name in rows:
+        percent = float(spent) / float(amount) * 100 if amount and float(amount) > 0 else 0
+        crossed = percent >= threshold
+        if crossed == bool(is_triggered):
+            continue
+        
+        # Умова на старий стан: з двох паралельних записів перехід "забере" лише один
+        changed = session.execute(
+            rules.update().where(
+                rules.c.budget_id == budget_id,
+                rules.c.threshold_percent == threshold,
+                rules.c.is_triggered == is_triggered
+            ).values(is_triggered=crossed)
+        ).rowcount
+        if changed and crossed:
+            notifications.append({
+                'user_id': user_id,
+                'budget_id': budget_id,
+                'kind': 'budget_threshold',
+                'message': f"Budget '{category_name or 'Uncategorized'}' reached {threshold}% "
+                           f"({float(spent):.2f} of {float(amount):.2f})",
+                'payload': json.dumps({
+                    'budget_id': budget_id,
+                    'threshold': threshold,
+                    'spent': float(spent),
+                    'amount': float(amount),
+                    'percent': round(percent, 2)
+                }),
+                'status': 'pending',
+                'attempts': 0,
+                'available_at': now,
+                'created_at': now
+            })
+    
+    if notifications:
+        session.execute(db.insert(Notification), notifications)
+
+
+def _before_commit(session):
+    evaluate(session)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('budget_touched', None)
+
+
+def init_app(app):
+    """Перевіряти правила сповіщень перед кожним commit, у тій самій транзакції БД"""
+    event.listen(Session, 'before_commit', _before_commit)
+    event.listen(Session, 'after_soft_rollback', _after_rollback)
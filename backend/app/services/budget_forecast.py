@@ -0,0 +1,246 @@
+from app import db
+from app.models import Budget, BudgetForecast, DailyCategoryTotal, UserDataVersion
+from app.services.etag import current_version
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необов'язкова залежність
+    np = None
+
+# Скільки користувачів прогнозувати за один запит у нічному режимі
+FORECAST_CHUNK_SIZE = 1000
+
+FORECAST_FIELDS = (
+    'spent', 'daily_rate', 'projected_linear', 'projected_spend',
+    'overrun_probability', 'days_elapsed', 'days_remaining'
+)
+
+
+def available():
+    return np is not None
+
+
+def _erf(x):
+    """Векторизована erf (Abramowitz-Stegun 7.1.26, похибка < 1.5e-7)"""
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+def _load(budget_filter, today):
+    """Активні на today бюджети і їхні денні витрати - одним запитом.
+    
+    LEFT JOIN денних підсумків категорії в межах [start_date, today]: бюджет
+    без витрат дає один рядок з NULL замість дня.
+    """
+    return db.session.query(
+        Budget.id,
+        Budget.user_id,
+        Budget.amount,
+        Budget.start_date,
+        Budget.end_date,
+        DailyCategoryTotal.day,
+        DailyCategoryTotal.total
+    ).outerjoin(
+        DailyCategoryTotal,
+        db.and_(
+            DailyCategoryTotal.user_id == Budget.user_id,
+            DailyCategoryTotal.category_id == Budget.category_id,
+            DailyCategoryTotal.transaction_type == 'expense',
+            DailyCategoryTotal.day >= Budget.start_date,
+            DailyCategoryTotal.day <= today
+        )
+    ).filter(
+        budget_filter,
+        Budget.start_date <= today,
+        Budget.end_date >= today
+    ).order_by(Budget.id).all()
+
+
+def _compute(rows, today):
+    """Прогнози для всіх бюджетів з rows однією серією операцій над масивами.
+    
+    Денні витрати розкладаються в матрицю бюджет x день від start_date.
+    Прогноз за темпом: spent + середнє за день * днів залишилось. Прогноз з
+    урахуванням дня тижня: для кожного дня тижня береться середнє за ним
+    (або загальне, якщо такого дня ще не було) і множиться на кількість
+    таких днів до end_date. Ймовірність перевитрати - нормальне наближення
+    суми решти днів (середнє і дисперсія денних витрат).
+    """
+    if not rows:
+        return {}
+    
+    ids = []
+    users = []
+    amounts = []
+    starts = []
+    ends = []
+    entry_rows = []
+    entry_days = []
+    entry_totals = []
+    for budget_id, user_id, amount, start_date, end_date, day, total in rows:
+        if not ids or ids[-1] != budget_id:
+            ids.append(budget_id)
+            users.append(user_id)
+            amounts.append(float(amount))
+            starts.append(start_date.toordinal())
+            ends.append(end_date.toordinal())
+        if day is not None:
+            entry_rows.append(len(ids) - 1)
+            entry_days.append(day.toordinal())
+            entry_totals.append(float(total))
+    
+    amounts = np.array(amounts)
+    starts = np.array(starts, dtype=np.int64)
+    ends = np.array(ends, dtype=np.int64)
+    today_ordinal = today.toordinal()
+    
+    elapsed = today_ordinal - starts + 1
+    remaining = ends - today_ordinal
+    width = int(elapsed.max())
+    
+    daily = np.zeros((len(ids), width))
+    if entry_rows:
+        np.add.at(
+            daily,
+            (np.array(entry_rows), np.array(entry_days, dtype=np.int64) - starts[entry_rows]),
+            np.array(entry_totals)
+        )
+    
+    offsets = np.arange(width)
+    observed = offsets[None, :] < elapsed[:, None]
+    # date.toordinal() % 7: понеділок = 1, ..., неділя = 0
+    weekdays = (starts[:, None] + offsets[None, :]) % 7
+    
+    spent = daily.sum(axis=1)
+    rate = spent / elapsed
+    projected_linear = spent + rate * remaining
+    
+    # Скільки кожного дня тижня припадає на решту періоду (today + 1 ... end_date)
+    first = (today_ordinal + 1) % 7
+    full_weeks, extra = remaining // 7, remaining % 7
+    projected_spend = spent.copy()
+    for weekday in range(7):
+        mask = observed & (weekdays == weekday)
+        count = mask.sum(axis=1)
+        mean = np.where(count > 0, (daily * mask).sum(axis=1) / np.maximum(count, 1), rate)
+        upcoming = full_weeks + ((weekday - first) % 7 < extra)
+        projected_spend += mean * upcoming
+    
+    variance = ((daily - rate[:, None]) ** 2 * observed).sum(axis=1) / elapsed
+    sigma = np.sqrt(variance * remaining)
+    headroom = amounts - spent - rate * remaining
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = headroom / sigma
+    probability = np.where(
+        sigma > 0,
+        0.5 * (1 - _erf(z / np.sqrt(2))),
+        (headroom < 0).astype(float)
+    )
+    probability = np.where(spent > amounts, 1.0, probability)
+    
+    result = {}
+    for index, budget_id in enumerate(ids):
+        result[budget_id] = {
+            'user_id': users[index],
+            'spent': round(float(spent[index]), 2),
+            'daily_rate': round(float(rate[index]), 2),
+            'projected_linear': round(float(projected_linear[index]), 2),
+            'projected_spend': round(float(projected_spend[index]), 2),
+            'overrun_probability': round(float(probability[index]), 4),
+            'days_elapsed': int(elapsed[index]),
+            'days_remaining': int(remaining[index])
+        }
+    return result
+
+
+def forecast_user(user_id, today=None):
+    """Прогнози для активних бюджетів користувача: {budget_id: поля прогнозу}.
+    
+    Якщо нічний розрахунок за сьогодні зроблено при тій самій версії даних
+    користувача, повертається він без повторного розрахунку.
+    """
+    today = today or date.today()
+    user_id = int(user_id)
+    version = current_version(user_id)
+    
+    stored = db.session.query(BudgetForecast).join(
+        Budget, Budget.id == BudgetForecast.budget_id
+    ).filter(
+        Budget.user_id == user_id,
+        Budget.start_date <= today,
+        Budget.end_date >= today
+    ).all()
+    active_count = Budget.query.filter(
+        Budget.user_id == user_id,
+        Budget.start_date <= today,
+        Budget.end_date >= today
+    ).count()
+    if stored and len(stored) == active_count and all(
+        row.computed_on == today and row.data_version == version for row in stored
+    ):
+        return {
+            row.budget_id: {field: _plain(getattr(row, field)) for field in FORECAST_FIELDS}
+            for row in stored
+        }
+    
+    forecasts = _compute(_load(Budget.user_id == user_id, today), today)
+    for values in forecasts.values():
+        values.pop('user_id')
+    return forecasts
+
+
+def _plain(value):
+    return float(value) if not isinstance(value, int) else value
+
+
+def run_nightly(today=None, chunk_size=FORECAST_CHUNK_SIZE):
+    """Прорахувати і зберегти прогнози всіх користувачів порціями за id.
+    
+    Одна порція - один запит даних, один векторизований розрахунок і один
+    пакетний запис. Повертає (користувачів, бюджетів).
+    """
+    today = today or date.today()
+    last_user_id = 0
+    users_done = 0
+    budgets_done = 0
+    
+    while True:
+        user_ids = [
+            user_id for (user_id,) in db.session.query(Budget.user_id).filter(
+                Budget.user_id > last_user_id,
+                Budget.start_date <= today,
+                Budget.end_date >= today
+            ).distinct().order_by(Budget.user_id).limit(chunk_size)
+        ]
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+        
+        versions = dict(db.session.query(UserDataVersion.user_id, UserDataVersion.version).filter(
+            UserDataVersion.user_id.in_(user_ids)
+        ).all())
+        forecasts = _compute(_load(Budget.user_id.in_(user_ids), today), today)
+        
+        if forecasts:
+            BudgetForecast.query.filter(
+                BudgetForecast.budget_id.in_(list(forecasts))
+            ).delete(synchronize_session=False)
+            db.session.execute(db.insert(BudgetForecast), [
+                dict(
+                    {field: values[field] for field in FORECAST_FIELDS},
+                    budget_id=budget_id,
+                    computed_on=today,
+                    data_version=versions.get(values['user_id'], 0)
+                )
+                for budget_id, values in forecasts.items()
+            ])
+        db.session.commit()
+        
+        users_done += len(user_ids)
+        budgets_done += len(forecasts)
+    
+    return users_done, budgets_done
@@ -0,0 +1,146 @@
+from app import db
+from app.models import Budget
+from app.services import budget_spend, budget_alerts
+from app.services.etag import bump
+from calendar import monthrange
+from datetime import date, timedelta
+from sqlalchemy import tuple_
+
+# Скільки користувачів обробляти в одній транзакції БД
+ROLLOVER_CHUNK_SIZE = 500
+
+
+def _is_calendar_month(start_date, end_date):
+    return start_date.day == 1 and end_date == start_date.replace(day=monthrange(start_date.year, start_date.month)[1])
+
+
+def next_period(start_date, end_date, today):
+    """Перший період після end_date, який ще не закінчився на today.
+    
+    Бюджет на календарний місяць переходить на наступні календарні місяці,
+    інші - на періоди тієї ж довжини. Пропущені періоди не створюються.
+    """
+    if _is_calendar_month(start_date, end_date):
+        start = end_date + timedelta(days=1)
+        while True:
+            end = start.replace(day=monthrange(start.year, start.month)[1])
+            if end >= today:
+                return start, end
+            start = end + timedelta(days=1)
+    
+    length = (end_date - start_date).days + 1
+    # Скільки цілих періодів пропущено між end_date і today
+    skipped = max(0, (today - end_date).days - 1) // length
+    start = end_date + timedelta(days=1 + skipped * length)
+    return start, start + timedelta(days=length - 1)
+
+
+def _due_users(today, after_user_id, chunk_size):
+    return [
+        user_id for (user_id,) in db.session.query(Budget.user_id).filter(
+            Budget.is_recurring.is_(True),
+            Budget.end_date < today,
+            Budget.user_id > after_user_id
+        ).distinct().order_by(Budget.user_id).limit(chunk_size)
+    ]
+
+
+def rollover(today=None, chunk_size=ROLLOVER_CHUNK_SIZE):
+    """Створити наступні періоди регулярних бюджетів, чий період закінчився.
+    
+    Користувачі обробляються порціями за зростанням id, кожна порція - одна
+    транзакція БД: вихідні бюджети блокуються FOR UPDATE SKIP LOCKED (паралельні
+    воркери беруть різні рядки), нові вставляються одним пакетом, а прапорець
+    is_recurring переходить з вихідного бюджету на новий у тому ж commit.
+    Тому повторний або перерваний запуск нічого не дублює. Якщо наступний
+    період уже зайнятий бюджетом тієї ж категорії, прапорець переходить на
+    нього, і серія продовжується після його завершення.
+    
+    Повертає (створено бюджетів, пропущено через перетин з наявними).
+    """
+    today = today or date.today()
+    created = 0
+    skipped = 0
+    last_user_id = 0
+    
+    while True:
+        user_ids = _due_users(today, last_user_id, chunk_size)
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+        
+        sources = Budget.query.filter(
+            Budget.user_id.in_(user_ids),
+            Budget.is_recurring.is_(True),
+            Budget.end_date < today
+        ).order_by(Budget.id).with_for_update(skip_locked=True).all()
+        
+        planned = {}
+        for budget in sources:
+            start, end = next_period(budget.start_date, budget.end_date, today)
+            planned[budget.id] = (budget, start, end)
+        
+        # Наявні бюджети тих самих категорій, з якими нові періоди можуть перетнутися
+        existing = {}
+        if planned:
+            rows = db.session.query(
+                Budget.id, Budget.user_id, Budget.category_id, Budget.start_date, Budget.end_date
+            ).filter(
+                Budget.user_id.in_(user_ids),
+                Budget.end_date >= min(start for _, start, _ in planned.values())
+            ).all()
+            for budget_id, user_id, category_id, start_date, end_date in rows:
+                existing.setdefault((user_id, category_id), []).append((start_date, end_date, budget_id))
+        
+        batch = []
+        inherit_ids = set()
+        users = set()
+        for budget, start, end in planned.values():
+            # Вихідний бюджет більше не регулярний: прапорець переходить на наступний період
+            budget.is_recurring = False
+            users.add(budget.user_id)
+            periods = existing.setdefault((budget.user_id, budget.category_id), [])
+            overlapping = [period for period in periods if period[0] <= end and period[1] >= start]
+            if overlapping:
+                # Період уже зайнятий наявним бюджетом - серія продовжується з нього
+                # (останнього з тих, що перетинаються; новий з цього запуску й так регулярний)
+                _, _, budget_id = max(overlapping, key=lambda period: period[1])
+                if budget_id is not None and budget_id != budget.id:
+                    inherit_ids.add(budget_id)
+                skipped += 1
+                continue
+            
+            periods.append((start, end, None))
+            batch.append({
+                'user_id': budget.user_id,
+                'category_id': budget.category_id,
+                'amount': budget.amount,
+                'start_date': start,
+                'end_date': end,
+                'spent': 0,
+                'is_recurring': True
+            })
+        
+        if inherit_ids:
+            db.session.execute(
+                db.update(Budget).where(Budget.id.in_(sorted(inherit_ids))).values(is_recurring=True)
+            )
+        
+        if batch:
+            db.session.execute(db.insert(Budget), batch)
+            new_ids = [
+                budget_id for (budget_id,) in db.session.query(Budget.id).filter(
+                    tuple_(Budget.user_id, Budget.category_id, Budget.start_date).in_(
+                        [(row['user_id'], row['category_id'], row['start_date']) for row in batch]
+                    )
+                )
+            ]
+            budget_spend.refresh(budget_ids=new_ids)
+            budget_alerts.add_default_rules(new_ids)
+        
+        for user_id in sorted(users):
+            bump(user_id)
+        db.session.commit()
+        created += len(batch)
+    
+    return created, skipped
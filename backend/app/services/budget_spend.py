@@ -0,0 +1,169 @@
+from app import db
+from app.models import Budget, DailyCategoryTotal, Transaction
+from app.services import budget_alerts
+from app.services.etag import bump
+from decimal import Decimal
+from sqlalchemy import func
+
+# Скільки бюджетів звіряти за один запит у verify()
+VERIFY_CHUNK_SIZE = 1000
+
+
+def adjust(user_id, category_id, day, amount):
+    """Додати amount до лічильника spent усіх бюджетів категорії, чиї дати покривають day.
+    
+    Викликається з rollups разом з оновленням денних підсумків, тож лічильник
+    змінюється в тій самій транзакції БД, що й сама транзакція, на кожному
+    шляху запису (створення, зміна, видалення, імпорт, пакет, регулярні).
+    """
+    if not amount or not category_id:
+        return
+    table = Budget.__table__
+    db.session.execute(
+        table.update().where(
+            table.c.user_id == user_id,
+            table.c.category_id == category_id,
+            table.c.start_date <= day,
+            table.c.end_date >= day
+        ).values(spent=table.c.spent + amount)
+    )
+    budget_alerts.touch(user_id, category_id, day)
+
+
+def _rollup_sum():
+    """Корельований підзапит: витрати категорії бюджету за його період з денних підсумків"""
+    return db.select(
+        func.coalesce(func.sum(DailyCategoryTotal.total), 0)
+    ).where(
+        DailyCategoryTotal.user_id == Budget.user_id,
+        DailyCategoryTotal.category_id == Budget.category_id,
+        DailyCategoryTotal.transaction_type == 'expense',
+        DailyCategoryTotal.day >= Budget.start_date,
+        DailyCategoryTotal.day <= Budget.end_date
+    ).scalar_subquery()
+
+
+def refresh(budgets=None, user_id=None, budget_ids=None):
+    """Перерахувати spent з денних підсумків одним UPDATE.
+    
+    Для нових бюджетів і після зміни категорії чи дат (budgets або budget_ids
+    для пакетно вставлених), а також після каскадного видалення транзакцій
+    разом з рахунком (user_id).
+    """
+    ids = [budget.id for budget in budgets or ()] + list(budget_ids or ())
+    stmt = db.update(Budget).values(spent=_rollup_sum())
+    if budgets is not None or budget_ids is not None:
+        stmt = stmt.where(Budget.id.in_(ids))
+    if user_id is not None:
+        stmt = stmt.where(Budget.user_id == int(user_id))
+    db.session.execute(stmt, execution_options={'synchronize_session': False})
+    
+    for budget in budgets or ():
+        db.session.expire(budget, ['spent'])
+    budget_alerts.touch_budgets(ids, user_id)
+
+
+def progress(budget):
+    """Поля прогресу бюджету для відповіді API"""
+    amount = float(budget.amount)
+    spent = float(budget.spent or 0)
+    return {
+        'spent': spent,
+        'remaining': amount - spent,
+        'percent': (spent / amount) * 100 if amount > 0 else 0
+    }
+
+
+def budget_dicts(budgets, category_names=None):
+    """Серіалізувати бюджети разом із витратами (spent, remaining, percent).
+    
+    category_names - назви категорій у тому ж порядку (з Budget.with_category_name),
+    щоб не робити lazy load категорії для кожного бюджету.
+    """
+    result = []
+    for index, budget in enumerate(budgets):
+        if category_names is not None:
+            budget_dict = budget.to_dict(category_name=category_names[index])
+        else:
+            budget_dict = budget.to_dict()
+        budget_dict.update(progress(budget))
+        result.append(budget_dict)
+    return result
+
+
+def budget_dict(budget):
+    """Один бюджет разом із витратами"""
+    return budget_dicts([budget])[0]
+
+
+def _ledger_spent(budget_ids):
+    """Витрати бюджетів, пораховані напряму з transactions (еталон для звірки)"""
+    day = func.date(Transaction.date)
+    rows = db.session.query(
+        Budget.id,
+        Budget.spent,
+        func.coalesce(func.sum(Transaction.amount), 0)
+    ).outerjoin(
+        Transaction,
+        db.and_(
+            Transaction.user_id == Budget.user_id,
+            Transaction.category_id == Budget.category_id,
+            Transaction.transaction_type == 'expense',
+            day >= Budget.start_date,
+            day <= Budget.end_date
+        )
+    ).filter(
+        Budget.id.in_(budget_ids)
+    ).group_by(Budget.id, Budget.spent).all()
+    return rows
+
+
+def verify(fix=False, chunk_size=VERIFY_CHUNK_SIZE):
+    """Звірити лічильники spent з транзакціями порціями за id бюджету.
+    
+    Повертає (перевірено бюджетів, список розбіжностей (budget_id, spent, expected)).
+    З fix=True розбіжності виправляються, commit - на кожну порцію.
+    """
+    checked = 0
+    mismatches = []
+    last_id = 0
+    
+    while True:
+        budget_ids = [
+            budget_id for (budget_id,) in db.session.query(Budget.id).filter(
+                Budget.id > last_id
+            ).order_by(Budget.id).limit(chunk_size)
+        ]
+        if not budget_ids:
+            break
+        last_id = budget_ids[-1]
+        
+        chunk_mismatches = []
+        for budget_id, spent, expected in _ledger_spent(budget_ids):
+            spent = Decimal(str(spent or 0))
+            expected = Decimal(str(expected)).quantize(Decimal('0.01'))
+            if spent != expected:
+                chunk_mismatches.append((budget_id, spent, expected))
+        
+        if fix:
+            for budget_id, _, expected in chunk_mismatches:
+                db.session.execute(
+                    db.update(Budget).where(Budget.id == budget_id).values(spent=expected),
+                    execution_options={'synchronize_session': False}
+                )
+            fixed_ids = [budget_id for budget_id, _, _ in chunk_mismatches]
+            budget_alerts.touch_budgets(fixed_ids)
+            # Нові значення мають дійти до клієнтів, а не лишитися за 304 зі старим ETag
+            if fixed_ids:
+                for (user_id,) in db.session.query(Budget.user_id).filter(
+                    Budget.id.in_(fixed_ids)
+                ).distinct().order_by(Budget.user_id):
+                    bump(user_id)
+            db.session.commit()
+        else:
+            db.session.rollback()
+        
+        checked += len(budget_ids)
+        mismatches.extend(chunk_mismatches)
+    
+    return checked, mismatches
@@ -0,0 +1,49 @@
+from app import db
+from app.models import UserDataVersion
+from app.services.sql import upsert_increment
+from collections import Counter
+from datetime import date
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+import hashlib
+
+
+def bump(user_id):
+    """Позначити, що дані користувача змінилися (в поточній транзакції БД)"""
+    upsert_increment(UserDataVersion.__table__, {'user_id': int(user_id)}, {'version': 1})
+    # Для обробників after_commit (кеш аналітики знає, на скільки зросла версія)
+    db.session.info.setdefault('bumped_users', Counter())[int(user_id)] += 1
+
+
+def current_version(user_id):
+    version = db.session.query(UserDataVersion.version).filter_by(user_id=int(user_id)).scalar()
+    return version or 0
+
+
+def etag_cached(fn):
+    """Віддати ETag з версії даних користувача і 304 на збіг If-None-Match.
+    
+    Перевірка відбувається до запуску view, тож на 304 не виконується жоден
+    запит, окрім читання версії за первинним ключем. У тег входить поточна
+    дата, бо деякі списки (бюджети за period) залежать від "сьогодні", і хеш
+    шляху з параметрами: інша сторінка, фільтр чи fields= - інше представлення.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        user_id = int(get_jwt_identity())
+        representation = hashlib.sha1(request.full_path.encode('utf-8')).hexdigest()[:16]
+        etag = f'{user_id}-{current_version(user_id)}-{date.today().toordinal()}-{representation}'
+        
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Authorization')
+        return response
+    return wrapper
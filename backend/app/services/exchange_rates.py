@@ -0,0 +1,282 @@
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import logging
+import requests
+import threading
+import time
+
+# Базова валюта таблиці курсів: усі інші пари рахуються як крос-курси через неї
+RATES_BASE = 'UAH'
+
+DEFAULT_TTL = 3600
+
+# Через скільки секунд повторити оновлення, якщо попереднє не вдалося
+RETRY_AFTER = 60
+
+REQUEST_TIMEOUT = 5
+
+# Скільки чекати на чуже завантаження курсів, коли в кеші ще нічого немає
+WAIT_TIMEOUT = REQUEST_TIMEOUT + 1
+
+# Округлення результатів конвертації: суми - до копійок, курси - до 6 знаків
+AMOUNT_QUANT = Decimal('0.01')
+RATE_QUANT = Decimal('0.000001')
+
+MAX_AMOUNT = Decimal('9999999999999.99')
+
+MAX_BATCH_CONVERSIONS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class RatesUnavailable(Exception):
+    """Курси не вдалося отримати, а в кеші їх немає"""
+
+
+class UnsupportedCurrency(ValueError):
+    """Валюти немає серед курсів базової таблиці"""
+
+
+class RateTable:
+    """Курси відносно base: 1 base = rates[X] X"""
+    
+    __slots__ = ('base', 'rates', 'fetched_at', 'updated_at', 'expires')
+    
+    def __init__(self, base, rates, updated_at, ttl):
+        self.base = base
+        self.rates = {currency: Decimal(str(rate)) for currency, rate in rates.items()}
+        self.rates[base] = Decimal('1')
+        self.fetched_at = datetime.now(timezone.utc)
+        # Час оновлення курсів у джерелі (unix)
+        self.updated_at = updated_at
+        self.expires = time.monotonic() + ttl
+    
+    @property
+    def is_stale(self):
+        return self.expires <= time.monotonic()
+    
+    def cross_rate(self, from_currency, to_currency):
+        """Курс from -> to через базову валюту; None, якщо валюти немає в таблиці"""
+        from_rate = self.rates.get(from_currency)
+        to_rate = self.rates.get(to_currency)
+        if from_rate is None or to_rate is None or not from_rate:
+            return None
+        return to_rate / from_rate
+
+
+# ============================================================================
+# Джерела курсів
+# ============================================================================
+
+class ExchangeRateApiProvider:
+    """exchangerate-api.com: одна HTTP-сесія (keep-alive) і таймаут на кожен запит"""
+    
+    URL = 'https://v6.exchangerate-api.com/v6/{api_key}/latest/{base}'
+    
+    def __init__(self, api_key, timeout=REQUEST_TIMEOUT):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+    
+    def fetch(self, base):
+        """Повернути (курси відносно base, unix-час оновлення в джерелі)"""
+        if not self.api_key:
+            raise RatesUnavailable('Exchange Rate API key is not configured')
+        
+        try:
+            response = self.session.get(self.URL.format(api_key=self.api_key, base=base), timeout=self.timeout)
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise RatesUnavailable(str(e))
+        
+        if data.get('result') != 'success':
+            raise RatesUnavailable(data.get('error-type', 'Unknown error'))
+        return data['conversion_rates'], data.get('time_last_update_unix', int(time.time()))
+
+
+class StaticProvider:
+    """Локальні фіксовані курси для розробки й тестів без мережі.
+    
+    rates задаються відносно RATES_BASE; для іншої бази перераховуються
+    крос-курсами.
+    """
+    
+    DEFAULT_RATES = {
+        'UAH': 1,
+        'USD': '0.0241',
+        'EUR': '0.0222',
+        'GBP': '0.0190',
+        'PLN': '0.0960'
+    }
+    
+    def __init__(self, rates=None):
+        self.rates = {currency: Decimal(str(rate)) for currency, rate in (rates or self.DEFAULT_RATES).items()}
+        self.rates.setdefault(RATES_BASE, Decimal('1'))
+    
+    def fetch(self, base):
+        if base not in self.rates:
+            raise RatesUnavailable(f'Unsupported currency: {base}')
+        base_rate = self.rates[base]
+        return {currency: rate / base_rate for currency, rate in self.rates.items()}, int(time.time())
+
+
+PROVIDERS = {
+    'exchangerate-api': lambda app: ExchangeRateApiProvider(app.config.get('EXCHANGE_RATE_API_KEY')),
+    'static': lambda app: StaticProvider()
+}
+
+
+# ============================================================================
+# Кеш
+# ============================================================================
+
+class RateCache:
+    """Кеш таблиць курсів за базовою валютою з TTL і stale-while-revalidate.
+    
+    Свіжа таблиця віддається одразу. Застаріла теж віддається одразу, а
+    оновлення запускається в одному фоновому потоці на базову валюту. Коли
+    таблиці ще немає, завантажує її лише перший запит, інші чекають на його
+    результат замість того, щоб усі разом іти до API (dogpile).
+    """
+    
+    def __init__(self, provider, ttl=DEFAULT_TTL):
+        self.provider = provider
+        self.ttl = ttl
+        self._tables = {}
+        self._loading = {}
+        # base -> (текст помилки, monotonic-час наступної спроби)
+        self._errors = {}
+        self._lock = threading.Lock()
+    
+    def _load(self, base, done):
+        try:
+            rates, updated_at = self.provider.fetch(base)
+            table = RateTable(base, rates, updated_at, self.ttl)
+            with self._lock:
+                self._tables[base] = table
+                self._errors.pop(base, None)
+        except Exception as e:
+            logger.warning('Exchange rate refresh for %s failed: %s', base, e)
+            with self._lock:
+                # Невдача теж кешується: до RETRY_AFTER запити не чекають таймауту API
+                self._errors[base] = (str(e), time.monotonic() + min(RETRY_AFTER, self.ttl))
+                stale = self._tables.get(base)
+                if stale is not None:
+                    # Не смикати API на кожен запит, поки воно недоступне
+                    stale.expires = time.monotonic() + min(RETRY_AFTER, self.ttl)
+        finally:
+            with self._lock:
+                self._loading.pop(base, None)
+            done.set()
+    
+    def get(self, base=RATES_BASE):
+        with self._lock:
+            table = self._tables.get(base)
+            if table is not None and not table.is_stale:
+                return table
+            
+            error = self._errors.get(base)
+            if table is None and error is not None and error[1] > time.monotonic():
+                raise RatesUnavailable(error[0])
+            
+            done = self._loading.get(base)
+            owner = done is None
+            if owner:
+                done = self._loading[base] = threading.Event()
+        
+        if table is not None:
+            # Застаріла таблиця: віддаємо її, оновлення - у фоні (лише один потік)
+            if owner:
+                threading.Thread(target=self._load, args=(base, done), daemon=True).start()
+            return table
+        
+        if owner:
+            self._load(base, done)
+        else:
+            done.wait(WAIT_TIMEOUT)
+        
+        with self._lock:
+            table = self._tables.get(base)
+            error = self._errors.get(base)
+        if table is None:
+            raise RatesUnavailable(error[0] if error else f'Exchange rates for {base} are unavailable')
+        return table
+    
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._errors.clear()
+
+
+# Кеш процесу; створюється в init_app
+_cache = None
+
+
+def init_app(app):
+    """Створити кеш із джерелом EXCHANGE_RATE_PROVIDER і TTL EXCHANGE_RATE_TTL"""
+    global _cache
+    name = app.config.get('EXCHANGE_RATE_PROVIDER', 'exchangerate-api')
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown EXCHANGE_RATE_PROVIDER '{name}', expected one of: {', '.join(PROVIDERS)}")
+    _cache = RateCache(PROVIDERS[name](app), int(app.config.get('EXCHANGE_RATE_TTL', DEFAULT_TTL)))
+
+
+def set_provider(provider, ttl=None):
+    """Підмінити джерело курсів (тести, локальна розробка); кеш очищується"""
+    global _cache
+    if ttl is None:
+        ttl = _cache.ttl if _cache is not None else DEFAULT_TTL
+    _cache = RateCache(provider, ttl)
+
+
+def get_table(base=RATES_BASE):
+    """Таблиця курсів з кешу процесу; піднімає RatesUnavailable, якщо курсів немає.
+    
+    Інша база, ніж RATES_BASE, приймається лише з валют базової таблиці
+    (UnsupportedCurrency): довільний ?base= не йде до API і не роздуває кеш.
+    """
+    if _cache is None:
+        raise RatesUnavailable('Exchange rates are not configured')
+    if base != RATES_BASE:
+        if len(base) != 3 or not base.isalpha() or base not in _cache.get(RATES_BASE).rates:
+            raise UnsupportedCurrency(f'Unsupported currency: {base}')
+    return _cache.get(base)
+
+
+# ============================================================================
+# Конвертація (локально, з однієї таблиці відносно RATES_BASE)
+# ============================================================================
+
+def parse_amount(value):
+    """Сума як Decimal; ValueError для нечислових і нескінченних значень"""
+    if isinstance(value, bool):
+        raise ValueError('Amount must be a number')
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError('Amount must be a number')
+    if not amount.is_finite():
+        raise ValueError('Amount must be a number')
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError('Amount is too large')
+    return amount
+
+
+def rate(from_currency, to_currency, table):
+    """Курс from -> to; ValueError, якщо валюти немає в таблиці"""
+    if from_currency == to_currency:
+        return Decimal('1')
+    for currency in (from_currency, to_currency):
+        if currency not in table.rates:
+            raise ValueError(f'Unsupported currency: {currency}')
+    return table.cross_rate(from_currency, to_currency)
+
+
+def convert(amount, from_currency, to_currency, table):
+    """(сума в to_currency, курс): сума округлюється до копійок ROUND_HALF_UP"""
+    pair_rate = rate(from_currency, to_currency, table)
+    return (amount * pair_rate).quantize(AMOUNT_QUANT, rounding=ROUND_HALF_UP), pair_rate
+
+
+def quantize_rate(value):
+    return value.quantize(RATE_QUANT, rounding=ROUND_HALF_UP)
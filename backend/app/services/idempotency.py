@@ -0,0 +1,203 @@
+from app import db
+from app.models import IdempotencyKey
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import request, current_app, jsonify
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import hashlib
+import threading
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_HOURS = 24
+LRU_SIZE = 1024
+
+# Скільки ключ вважається зайнятим запитом, що виконується. Claim процесу,
+# який упав, не отримав відповіді - після цього строку ключ можна зайняти знову
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+class _ResponseLRU:
+    """LRU завершених відповідей у пам'яті процесу перед таблицею idempotency_keys.
+    
+    Завершений запис більше не змінюється, тому кеш не потребує інвалідації:
+    достатньо перевіряти expires_at.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry[3] <= datetime.utcnow():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry
+    
+    def put(self, cache_key, entry):
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_lru = _ResponseLRU(LRU_SIZE)
+
+
+def _request_hash():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(b'\n')
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _replay(entry, request_hash):
+    stored_hash, status_code, body, _ = entry
+    if stored_hash != request_hash:
+        return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+    response = current_app.response_class(body, status=status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(user_id, key, request_hash, expires_at):
+    """Зайняти ключ до виконання запиту. Повертає збережений запис, якщо ключ уже є"""
+    existing = db.session.get(IdempotencyKey, (user_id, key))
+    if existing is not None and existing.expires_at <= datetime.utcnow():
+        db.session.delete(existing)
+        db.session.flush()
+        existing = None
+    
+    if existing is None:
+        db.session.add(IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            expires_at=expires_at
+        ))
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            # Паралельний запит з тим самим ключем встиг першим
+            db.session.rollback()
+            existing = db.session.get(IdempotencyKey, (user_id, key))
+    
+    return existing
+
+
+def _release(user_id, key):
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(user_id=user_id, key=key).delete()
+    db.session.commit()
+
+
+def _store(user_id, key, status_code, body, expires_at):
+    """Зберегти відповідь для повторів; None, якщо ключ уже видалено"""
+    record = db.session.get(IdempotencyKey, (user_id, key))
+    if record is None:
+        return None
+    record.status_code = status_code
+    record.response_body = body
+    record.expires_at = expires_at
+    db.session.commit()
+    return (record.request_hash, record.status_code, body, record.expires_at)
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_committed(session):
+    # view з ключем уже зафіксував дані (напр. порції імпорту)
+    if 'idempotency_key' in session.info:
+        session.info['idempotency_committed'] = True
+
+
+def idempotent(fn):
+    """Підтримка заголовка Idempotency-Key для POST-ендпоінтів створення.
+    
+    Перший запит займає ключ у таблиці idempotency_keys на CLAIM_LEASE,
+    виконується і зберігає успішну відповідь на IDEMPOTENCY_KEY_TTL_HOURS.
+    Повтор з тим самим ключем віддає її без виконання view (із LRU процесу -
+    взагалі без запитів до БД). Неуспішна відповідь звільняє ключ, щоб клієнт
+    міг виправити запит і повторити - але лише якщо view нічого не зафіксував:
+    інакше зберігається і вона, бо повтор задублював би вже записані дані.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return fn(*args, **kwargs)
+        
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters'}), 400
+        
+        user_id = int(get_jwt_identity())
+        request_hash = _request_hash()
+        cache_key = (user_id, key)
+        
+        cached = _lru.get(cache_key)
+        if cached is not None:
+            return _replay(cached, request_hash)
+        
+        ttl = timedelta(hours=current_app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', DEFAULT_TTL_HOURS))
+        existing = _claim(user_id, key, request_hash, datetime.utcnow() + CLAIM_LEASE)
+        if existing is not None:
+            if existing.status_code is None:
+                if existing.request_hash != request_hash:
+                    return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+                return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+            entry = (existing.request_hash, existing.status_code, existing.response_body, existing.expires_at)
+            _lru.put(cache_key, entry)
+            return _replay(entry, request_hash)
+        
+        db.session.info['idempotency_key'] = cache_key
+        try:
+            response = current_app.make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            if db.session.info.pop('idempotency_committed', False):
+                db.session.info.pop('idempotency_key', None)
+                body = current_app.json.dumps({'error': 'Request failed after part of the changes was saved'})
+                _store(user_id, key, 500, body, datetime.utcnow() + ttl)
+            else:
+                db.session.info.pop('idempotency_key', None)
+                _release(user_id, key)
+            raise
+        committed = db.session.info.pop('idempotency_committed', False)
+        db.session.info.pop('idempotency_key', None)
+        
+        if not 200 <= response.status_code < 300 and not committed:
+            _release(user_id, key)
+            return response
+        
+        entry = _store(user_id, key, response.status_code, response.get_data(as_text=True), datetime.utcnow() + ttl)
+        if entry is not None:
+            _lru.put(cache_key, entry)
+        return response
+    return wrapper
+
+
+def purge_expired():
+    """Видалити прострочені ключі. Повертає кількість видалених рядків"""
+    deleted = IdempotencyKey.query.filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
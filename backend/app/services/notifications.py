@@ -0,0 +1,77 @@
+from app import db
+from app.models import Notification
+from datetime import datetime, timedelta
+from flask import current_app
+import json
+import requests
+
+# Скільки сповіщень забирати з черги за один commit
+DRAIN_BATCH_SIZE = 100
+
+# Після стількох невдалих спроб сповіщення позначається як failed
+MAX_ATTEMPTS = 5
+
+WEBHOOK_TIMEOUT = 5
+
+
+def deliver(notification):
+    """Доставити сповіщення. Піднімає виняток, якщо доставка не вдалася.
+    
+    Без NOTIFICATION_WEBHOOK_URL сповіщення лише стає видимим у
+    GET /api/notifications (доставка всередині застосунку).
+    """
+    url = current_app.config.get('NOTIFICATION_WEBHOOK_URL')
+    if not url:
+        return
+    response = requests.post(url, json={
+        'id': notification.id,
+        'user_id': notification.user_id,
+        'kind': notification.kind,
+        'message': notification.message,
+        'payload': json.loads(notification.payload) if notification.payload else None
+    }, timeout=WEBHOOK_TIMEOUT)
+    response.raise_for_status()
+
+
+def drain(batch_size=DRAIN_BATCH_SIZE, deliver_fn=deliver):
+    """Розіслати сповіщення з черги порціями. Повертає (доставлено, невдалих спроб).
+    
+    Порція блокується FOR UPDATE SKIP LOCKED, тож кілька воркерів не
+    надсилають одне сповіщення двічі. Невдала спроба відкладає сповіщення
+    з експоненційною затримкою.
+    """
+    sent = 0
+    failed = 0
+    
+    while True:
+        now = datetime.utcnow()
+        batch = Notification.query.filter(
+            Notification.status == 'pending',
+            Notification.available_at <= now
+        ).order_by(
+            Notification.available_at, Notification.id
+        ).limit(batch_size).with_for_update(skip_locked=True).all()
+        
+        if not batch:
+            db.session.rollback()
+            break
+        
+        for notification in batch:
+            try:
+                deliver_fn(notification)
+            except Exception as e:
+                notification.attempts += 1
+                failed += 1
+                current_app.logger.warning('Notification %s delivery failed: %s', notification.id, e)
+                if notification.attempts >= MAX_ATTEMPTS:
+                    notification.status = 'failed'
+                else:
+                    notification.available_at = now + timedelta(minutes=2 ** notification.attempts)
+                continue
+            notification.status = 'sent'
+            notification.sent_at = now
+            sent += 1
+        
+        db.session.commit()
+    
+    return sent, failed
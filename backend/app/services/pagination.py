@@ -0,0 +1,32 @@
+import base64
+from datetime import datetime
+
+# Розмір сторінки за замовчуванням та жорстка межа для параметра limit
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_CURSOR_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def encode_cursor(date, row_id):
+    """Закодувати позицію (date, id) останнього рядка сторінки у непрозорий рядок"""
+    raw = f"{date.strftime(_CURSOR_DATE_FORMAT)}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Розкодувати курсор у пару (date, id). Піднімає ValueError для некоректного курсора"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        date_part, id_part = raw.split('|')
+        return datetime.strptime(date_part, _CURSOR_DATE_FORMAT), int(id_part)
+    except (ValueError, UnicodeError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_limit(value):
+    """Обмежити запитаний розмір сторінки діапазоном [1, MAX_PAGE_SIZE]"""
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(value, MAX_PAGE_SIZE))
@@ -0,0 +1,106 @@
+from app import db
+from app.models import Account, Transaction, User
+from app.services.balances import signed_amount_sql
+from app.services.etag import bump
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from sqlalchemy import func
+import time
+
+# Скільки користувачів звіряти одним агрегатним запитом
+RECONCILE_CHUNK_SIZE = 1000
+
+
+def _ledger_sum():
+    """Корельований підзапит: сума впливу транзакцій рахунку на баланс"""
+    return db.select(
+        func.coalesce(func.sum(signed_amount_sql()), 0)
+    ).where(
+        Transaction.account_id == Account.id
+    ).scalar_subquery()
+
+
+def _user_chunks(chunk_size):
+    """Списки id користувачів за зростанням (keyset, без OFFSET)"""
+    last_id = 0
+    while True:
+        user_ids = [
+            user_id for (user_id,) in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size)
+        ]
+        if not user_ids:
+            return
+        last_id = user_ids[-1]
+        yield user_ids
+
+
+def reconcile_chunk(user_ids, fix=False):
+    """Звірити баланси рахунків користувачів з журналом транзакцій.
+    
+    Один GROUP BY на порцію без ORM-об'єктів: balance порівнюється з
+    opening_balance + сума транзакцій. З fix=True розбіжні рахунки
+    виправляються одним UPDATE з тим самим підзапитом, тож транзакції,
+    записані між читанням і виправленням, теж враховуються.
+    
+    Повертає (перевірено рахунків, список (account_id, user_id, balance, expected)).
+    """
+    rows = db.session.query(
+        Account.id,
+        Account.user_id,
+        Account.balance,
+        Account.opening_balance + func.coalesce(func.sum(signed_amount_sql()), 0)
+    ).outerjoin(
+        Transaction, Transaction.account_id == Account.id
+    ).filter(
+        Account.user_id.in_(user_ids)
+    ).group_by(
+        Account.id, Account.user_id, Account.balance, Account.opening_balance
+    ).all()
+    
+    mismatches = []
+    for account_id, user_id, balance, expected in rows:
+        balance = Decimal(str(balance or 0))
+        expected = Decimal(str(expected)).quantize(Decimal('0.01'))
+        if balance != expected:
+            mismatches.append((account_id, user_id, balance, expected))
+    
+    if fix and mismatches:
+        db.session.execute(
+            db.update(Account).where(
+                Account.id.in_([account_id for account_id, _, _, _ in mismatches])
+            ).values(balance=Account.opening_balance + _ledger_sum()),
+            execution_options={'synchronize_session': False}
+        )
+        for user_id in sorted({user_id for _, user_id, _, _ in mismatches}):
+            bump(user_id)
+        db.session.commit()
+    else:
+        db.session.rollback()
+    
+    return len(rows), mismatches
+
+
+def reconcile(app, fix=False, workers=4, chunk_size=RECONCILE_CHUNK_SIZE):
+    """Звірити всі рахунки порціями користувачів у пулі потоків.
+    
+    Кожен потік працює у власному контексті застосунку, тобто з власною
+    сесією і з'єднанням з пулу; запити до БД відпускають GIL, тож порції
+    виконуються паралельно. Генерує (номер порції, кількість користувачів,
+    перевірено рахунків, розбіжності, секунд) у міру завершення порцій.
+    """
+    def run(user_ids):
+        with app.app_context():
+            started = time.perf_counter()
+            checked, mismatches = reconcile_chunk(user_ids, fix)
+            return checked, mismatches, time.perf_counter() - started
+    
+    with app.app_context():
+        chunks = list(_user_chunks(chunk_size))
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run, user_ids): (index, len(user_ids)) for index, user_ids in enumerate(chunks, start=1)}
+        for future in as_completed(futures):
+            index, users = futures[future]
+            checked, mismatches, elapsed = future.result()
+            yield index, users, checked, mismatches, elapsed
@@ -0,0 +1,149 @@
+from app import db
+from app.models import RecurringTransaction, Transaction
+from app.services import rollups, balance_history, analytics_cache
+from app.services.balances import signed_amount, apply_delta
+from app.services.etag import bump
+from calendar import monthrange
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+INTERVAL_UNITS = ('day', 'week', 'month', 'year')
+
+# Скільки шаблонів блокувати і матеріалізувати в одній транзакції БД
+RECURRING_CHUNK_SIZE = 500
+
+# Максимум пропущених повторів одного шаблону за запуск (захист від
+# щоденного шаблону, який не запускали роками)
+MAX_CATCH_UP = 366
+
+
+def _add_months(day, months, anchor_day):
+    """Зсунути дату на months місяців, тримаючись дня anchor_day (з обрізанням до кінця місяця)"""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(anchor_day, monthrange(year, month)[1]))
+
+
+def next_occurrence(template, day):
+    """Дата наступного повтору після day"""
+    count = template.interval_count or 1
+    if template.interval_unit == 'day':
+        return day + timedelta(days=count)
+    if template.interval_unit == 'week':
+        return day + timedelta(weeks=count)
+    months = count * 12 if template.interval_unit == 'year' else count
+    return _add_months(day, months, template.start_date.day)
+
+
+def due_occurrences(template, today):
+    """Дати всіх повторів шаблону до today включно і нове значення next_run"""
+    dates = []
+    day = template.next_run
+    while day <= today and len(dates) < MAX_CATCH_UP:
+        if template.end_date and day > template.end_date:
+            break
+        dates.append(day)
+        day = next_occurrence(template, day)
+    return dates, day
+
+
+def _claim_due(today, chunk_size):
+    """Заблокувати порцію шаблонів, які пора виконати.
+    
+    FOR UPDATE SKIP LOCKED (MySQL 8, PostgreSQL): кілька вузлів, які запускають
+    команду одночасно, отримують різні шаблони і не чекають один на одного.
+    Блокування тримається до commit, у якому next_run уже зсунуто, тому шаблон
+    не буде матеріалізовано двічі. SQLite цю конструкцію ігнорує - там
+    записи й так серіалізуються блокуванням бази.
+    """
+    return RecurringTransaction.query.filter(
+        RecurringTransaction.is_active.is_(True),
+        RecurringTransaction.next_run <= today
+    ).order_by(
+        RecurringTransaction.id
+    ).limit(chunk_size).with_for_update(skip_locked=True).all()
+
+
+def run_due(today=None, chunk_size=RECURRING_CHUNK_SIZE):
+    """Матеріалізувати всі повтори, які настали, для всіх користувачів.
+    
+    Кожна порція - одна транзакція БД: пакетна вставка транзакцій, одне
+    оновлення балансу на рахунок, зсув next_run і commit. Якщо запуск
+    перервано, незафіксована порція відкочується цілком разом зі зсувом
+    next_run, тож повторний запуск не створить дублікатів.
+    
+    Повертає (кількість оброблених шаблонів, кількість створених транзакцій).
+    """
+    today = today or date.today()
+    processed = 0
+    created = 0
+    
+    while True:
+        templates = _claim_due(today, chunk_size)
+        if not templates:
+            db.session.rollback()
+            break
+        
+        balance_history.ensure_snapshots({template.account_id for template in templates}, today)
+        
+        batch = []
+        balance_deltas = defaultdict(Decimal)
+        snapshot_deltas = defaultdict(Decimal)
+        rollup_deltas = defaultdict(lambda: [Decimal('0'), 0])
+        users = set()
+        
+        for template in templates:
+            dates, next_run = due_occurrences(template, today)
+            template.next_run = next_run
+            if template.end_date and next_run > template.end_date:
+                template.is_active = False
+            
+            amount = Decimal(str(template.amount))
+            effect = signed_amount(template.transaction_type, amount)
+            for day in dates:
+                when = datetime.combine(day, datetime.min.time())
+                batch.append({
+                    'user_id': template.user_id,
+                    'account_id': template.account_id,
+                    'category_id': template.category_id,
+                    'amount': amount,
+                    'description': template.description or '',
+                    'transaction_type': template.transaction_type,
+                    'date': when
+                })
+                balance_deltas[template.account_id] += effect
+                snapshot_deltas[(template.account_id, balance_history.month_end(when))] += effect
+                
+                key = (template.user_id, day, template.category_id, template.transaction_type)
+                rollup_deltas[key][0] += amount
+                rollup_deltas[key][1] += 1
+            
+            if dates:
+                users.add(template.user_id)
+        
+        if batch:
+            db.session.execute(db.insert(Transaction), batch)
+        
+        # Рахунки в сталому порядку - паралельні вузли не заблокують один одного навхрест
+        for account_id in sorted(balance_deltas):
+            if balance_deltas[account_id]:
+                apply_delta(account_id, balance_deltas[account_id])
+        
+        for (account_id, period_end), delta in sorted(snapshot_deltas.items()):
+            balance_history.adjust(account_id, period_end, delta)
+        
+        for (user_id, day, category_id, transaction_type), (amount, count) in rollup_deltas.items():
+            rollups.add_total(user_id, day, category_id, transaction_type, amount, count)
+        
+        for user_id in sorted(users):
+            bump(user_id)
+            # Пакетний INSERT оминає події ORM - кеш перезавантажиться з БД
+            analytics_cache.invalidate(user_id)
+        
+        db.session.commit()
+        processed += len(templates)
+        created += len(batch)
+    
+    return processed, created
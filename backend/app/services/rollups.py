@@ -0,0 +1,113 @@
+from app import db
+from app.models import Transaction, DailyCategoryTotal
+from app.services.sql import upsert_increment
+from app.services import budget_spend
+from app.services.etag import bump
+from decimal import Decimal
+from sqlalchemy import func
+
+# Категорія-заглушка для транзакцій без категорії
+NO_CATEGORY = 0
+
+# Скільки користувачів перераховувати в одній транзакції БД під час rebuild
+REBUILD_CHUNK_SIZE = 500
+
+
+def _upsert(user_id, day, category_id, transaction_type, amount, count):
+    """Додати amount/count до рядка rollup, створивши його за потреби.
+    
+    Витрати заодно потрапляють у лічильники spent бюджетів цієї категорії.
+    """
+    upsert_increment(
+        DailyCategoryTotal.__table__,
+        {
+            'user_id': user_id,
+            'day': day,
+            'category_id': category_id,
+            'transaction_type': transaction_type
+        },
+        {'total': amount, 'count': count}
+    )
+    if transaction_type == 'expense':
+        budget_spend.adjust(user_id, category_id, day, amount)
+
+
+def _apply(transaction, sign):
+    _upsert(
+        transaction.user_id,
+        transaction.date.date(),
+        transaction.category_id or NO_CATEGORY,
+        transaction.transaction_type,
+        sign * Decimal(str(transaction.amount)),
+        sign
+    )
+
+
+def add_total(user_id, day, category_id, transaction_type, amount, count):
+    """Додати вже агреговану суму за день (для пакетних записів)"""
+    _upsert(user_id, day, category_id or NO_CATEGORY, transaction_type, amount, count)
+
+
+def add_transaction(transaction):
+    """Врахувати транзакцію в rollup (в поточній транзакції БД)"""
+    _apply(transaction, 1)
+
+
+def remove_transaction(transaction):
+    """Прибрати транзакцію з rollup; викликати до зміни її полів"""
+    _apply(transaction, -1)
+
+
+def reassign_category(user_id, category_id):
+    """Перенести підсумки видаленої категорії у "без категорії" (як ON DELETE SET NULL)"""
+    rows = DailyCategoryTotal.query.filter_by(user_id=user_id, category_id=category_id).all()
+    for row in rows:
+        _upsert(user_id, row.day, NO_CATEGORY, row.transaction_type, row.total, row.count)
+        db.session.delete(row)
+
+
+def rebuild(user_ids=None, chunk_size=REBUILD_CHUNK_SIZE):
+    """Перерахувати rollup з таблиці transactions (backfill і ремонт).
+    
+    Користувачі обробляються порціями з commit після кожної, щоб не тримати
+    довгих блокувань. Повертає кількість оброблених користувачів.
+    """
+    if user_ids is None:
+        user_ids = [row[0] for row in db.session.query(Transaction.user_id).distinct()]
+        user_ids += [
+            row[0] for row in db.session.query(DailyCategoryTotal.user_id).distinct()
+            if row[0] not in user_ids
+        ]
+    
+    user_ids = sorted(set(user_ids))
+    table = DailyCategoryTotal.__table__
+    
+    for i in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[i:i + chunk_size]
+        
+        db.session.execute(table.delete().where(table.c.user_id.in_(chunk)))
+        
+        day = func.date(Transaction.date)
+        category_id = func.coalesce(Transaction.category_id, NO_CATEGORY)
+        select = db.select(
+            Transaction.user_id,
+            day,
+            category_id,
+            Transaction.transaction_type,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id)
+        ).where(
+            Transaction.user_id.in_(chunk)
+        ).group_by(
+            Transaction.user_id, day, category_id, Transaction.transaction_type
+        )
+        db.session.execute(table.insert().from_select(
+            ['user_id', 'day', 'category_id', 'transaction_type', 'total', 'count'],
+            select
+        ))
+        # Підсумки (/summary) могли змінитися - скидаємо ETag користувачів порції
+        for user_id in chunk:
+            bump(user_id)
+        db.session.commit()
+    
+    return len(user_ids)
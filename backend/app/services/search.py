@@ -0,0 +1,66 @@
+import re
+from app import db
+from app.models import Transaction
+from sqlalchemy import Integer, text
+
+# Слова запиту: літери/цифри будь-якої мови
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Дзеркальна FTS5-таблиця для SQLite (тести/локальна розробка), яку
+# синхронізують тригери - аналог FULLTEXT-індексу MySQL
+_SQLITE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts
+       USING fts5(description, content='transactions', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+         INSERT INTO transactions_fts(rowid, description) VALUES (new.id, new.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+         INSERT INTO transactions_fts(transactions_fts, rowid, description)
+         VALUES ('delete', old.id, old.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description ON transactions BEGIN
+         INSERT INTO transactions_fts(transactions_fts, rowid, description)
+         VALUES ('delete', old.id, old.description);
+         INSERT INTO transactions_fts(rowid, description) VALUES (new.id, new.description);
+       END""",
+)
+
+
+def init_search_index():
+    """Створити FTS5-дзеркало на SQLite; на MySQL індекс ft_description вже є в схемі"""
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.begin() as conn:
+        for statement in _SQLITE_FTS_DDL:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"))
+
+
+def apply_search(query, q):
+    """Відфільтрувати запит транзакцій за словами в описі (всі слова, з префіксами)"""
+    tokens = _TOKEN_RE.findall(q or '')
+    if not tokens:
+        return query
+    
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'mysql':
+        # Boolean mode: кожне слово обов'язкове (+), допускається префікс (*)
+        terms = ' '.join(f'+{token}*' for token in tokens)
+        return query.filter(
+            text('MATCH (transactions.description) AGAINST (:search_terms IN BOOLEAN MODE)')
+            .bindparams(search_terms=terms)
+        )
+    
+    if dialect == 'sqlite':
+        terms = ' '.join(f'"{token}"*' for token in tokens)
+        return query.filter(Transaction.id.in_(
+            text('SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH :search_terms')
+            .bindparams(search_terms=terms)
+            .columns(rowid=Integer)
+        ))
+    
+    # Інші СУБД: повільний, але коректний пошук без індексу
+    for token in tokens:
+        query = query.filter(Transaction.description.ilike(f'%{token}%'))
+    return query
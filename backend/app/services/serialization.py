@@ -0,0 +1,96 @@
+from app.models import Transaction, Account, Category
+
+
+def format_datetime(value):
+    """Те саме, що strftime('%Y-%m-%d %H:%M:%S'), але в кілька разів швидше"""
+    return value.isoformat(sep=' ', timespec='seconds') if value is not None else None
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+# Поле відповіді -> (колонка SQL, перетворення значення)
+TRANSACTION_FIELDS = {
+    'id': (Transaction.id, None),
+    'account_id': (Transaction.account_id, None),
+    'account_name': (Account.name, None),
+    'category_id': (Transaction.category_id, None),
+    'category_name': (Category.name, None),
+    'amount': (Transaction.amount, _float),
+    'description': (Transaction.description, None),
+    'transaction_type': (Transaction.transaction_type, None),
+    'date': (Transaction.date, format_datetime),
+    'created_at': (Transaction.created_at, format_datetime)
+}
+
+# Поля списків рахунків і категорій (ті самі, що в to_dict())
+ACCOUNT_FIELDS = {
+    'id': (Account.id, None),
+    'name': (Account.name, None),
+    'balance': (Account.balance, _float),
+    'currency': (Account.currency, None),
+    'is_active': (Account.is_active, None),
+    'created_at': (Account.created_at, format_datetime)
+}
+
+CATEGORY_FIELDS = {
+    'id': (Category.id, None),
+    'name': (Category.name, None),
+    'type': (Category.type, None),
+    'color': (Category.color, None)
+}
+
+
+def parse_fields(value, allowed):
+    """Розібрати параметр fields=a,b,c. None - всі поля; ValueError для невідомих"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def select_columns(field_map, fields):
+    """Колонки лише запитаних полів (None - всі) і функція серіалізації рядка"""
+    fields = list(field_map) if fields is None else fields
+    columns = [field_map[field][0] for field in fields]
+    converters = [(field, field_map[field][1]) for field in fields]
+    
+    def serialize(row):
+        return {
+            field: convert(value) if convert else value
+            for (field, convert), value in zip(converters, row)
+        }
+    
+    return columns, serialize
+
+
+def transaction_columns(fields):
+    """Колонки для запиту списку транзакцій.
+    
+    Завжди вибираються id і date (потрібні для курсора) - вони йдуть першими.
+    Повертає (колонки, потрібні JOIN-и, функція серіалізації рядка).
+    """
+    fields = list(TRANSACTION_FIELDS) if fields is None else fields
+    columns = [Transaction.id, Transaction.date]
+    converters = []
+    for field in fields:
+        column, convert = TRANSACTION_FIELDS[field]
+        columns.append(column)
+        converters.append((field, len(columns) - 1, convert))
+    
+    joins = {
+        'account': 'account_name' in fields,
+        'category': 'category_name' in fields
+    }
+    
+    def serialize(row):
+        return {
+            field: convert(row[index]) if convert else row[index]
+            for field, index, convert in converters
+        }
+    
+    return columns, joins, serialize
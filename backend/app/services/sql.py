@@ -0,0 +1,81 @@
+from app import db
+from sqlalchemy import func
+
+
+def upsert_increment(table, keys, increments):
+    """Додати increments до рядка з ключем keys або вставити його (одним запитом).
+    
+    На MySQL - INSERT ... ON DUPLICATE KEY UPDATE, на SQLite - ON CONFLICT DO UPDATE.
+    """
+    values = {**keys, **increments}
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update({
+            name: table.c[name] + stmt.inserted[name] for name in increments
+        })
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys],
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments}
+        )
+    else:
+        # Загальний варіант для інших СУБД: UPDATE, а якщо рядка немає - INSERT
+        result = db.session.execute(
+            table.update().where(
+                *[table.c[name] == value for name, value in keys.items()]
+            ).values({name: table.c[name] + value for name, value in increments.items()})
+        )
+        if result.rowcount:
+            return
+        stmt = table.insert().values(**values)
+    
+    db.session.execute(stmt)
+
+
+
+def insert_ignore(table, rows):
+    """Вставити рядки, пропускаючи ті, чий ключ уже є (паралельна вставка не падає)"""
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'mysql':
+        stmt = table.insert().prefix_with('IGNORE')
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).on_conflict_do_nothing()
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).on_conflict_do_nothing()
+    
+    db.session.execute(stmt, rows)
+
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+
+def period_bucket(column, granularity):
+    """SQL-вираз початку періоду (день/тиждень з понеділка/місяць/рік) для дати"""
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'sqlite':
+        if granularity == 'day':
+            return func.date(column)
+        if granularity == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        if granularity == 'month':
+            return func.strftime('%Y-%m-01', column)
+        return func.strftime('%Y-01-01', column)
+    
+    # MySQL
+    if granularity == 'day':
+        return func.date(column)
+    if granularity == 'week':
+        # SUBDATE(дата, N) віднімає N днів; WEEKDAY: понеділок = 0
+        return func.subdate(func.date(column), func.weekday(column))
+    if granularity == 'month':
+        return func.date_format(column, '%Y-%m-01')
+    return func.date_format(column, '%Y-01-01')
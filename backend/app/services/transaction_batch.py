@@ -0,0 +1,163 @@
+from app import db
+from app.models import Transaction, Category
+from app.services import rollups
+from app.services.balances import signed_amount, apply_delta
+from app.services import balance_history
+from app.services.etag import bump
+from app.services.transaction_import import MAX_AMOUNT, MAX_DESCRIPTION_LENGTH
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# Максимальна кількість операцій в одному пакеті
+MAX_BATCH_OPERATIONS = 500
+
+TRANSACTION_TYPES = ('income', 'expense', 'transfer')
+
+
+class _Totals:
+    """Накопичувач змін балансів і денних підсумків, які застосовуються один раз"""
+    
+    def __init__(self):
+        self.balances = defaultdict(Decimal)
+        self.snapshots = defaultdict(Decimal)
+        self.rollups = defaultdict(lambda: [Decimal('0'), 0])
+    
+    def add(self, transaction, sign):
+        effect = sign * signed_amount(transaction.transaction_type, transaction.amount)
+        self.balances[transaction.account_id] += effect
+        self.snapshots[(transaction.account_id, balance_history.month_end(transaction.date))] += effect
+        key = (transaction.date.date(), transaction.category_id, transaction.transaction_type)
+        self.rollups[key][0] += sign * Decimal(str(transaction.amount))
+        self.rollups[key][1] += sign
+
+
+def _is_id(value):
+    """Ціле id з JSON; true/false теж int у Python, але не id"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_update(data, categories):
+    """Перевірити поля оновлення; повернути (нормалізовані значення, помилка)"""
+    values = {}
+    
+    if 'amount' in data:
+        try:
+            amount = Decimal(str(data['amount']))
+        except InvalidOperation:
+            return None, 'Invalid amount'
+        if not amount.is_finite() or amount <= 0:
+            return None, 'Amount must be greater than zero'
+        if amount > MAX_AMOUNT:
+            return None, 'Amount is too large'
+        values['amount'] = amount
+    
+    if 'transaction_type' in data:
+        if data['transaction_type'] not in TRANSACTION_TYPES:
+            return None, 'Transaction type must be "income", "expense", or "transfer"'
+        values['transaction_type'] = data['transaction_type']
+    
+    if 'description' in data:
+        description = data['description']
+        if description is not None:
+            description = str(description)
+            if len(description) > MAX_DESCRIPTION_LENGTH:
+                return None, f'Description must be at most {MAX_DESCRIPTION_LENGTH} characters'
+        values['description'] = description
+    
+    if 'date' in data:
+        try:
+            values['date'] = datetime.strptime(str(data['date']), '%Y-%m-%d')
+        except ValueError:
+            return None, 'Invalid date format. Use YYYY-MM-DD'
+    
+    if 'category_id' in data:
+        if isinstance(data['category_id'], bool):
+            return None, 'Invalid category_id'
+        if data['category_id']:
+            if data['category_id'] not in categories:
+                return None, 'Category not found'
+            values['category_id'] = data['category_id']
+        else:
+            values['category_id'] = None
+    
+    return values, None
+
+
+def run_batch(user_id, operations):
+    """Виконати операції update/delete над транзакціями в одній транзакції БД.
+    
+    Всі цілі читаються одним IN-запитом, категорії - ще одним; зміни балансів
+    і підсумків сумуються по рахунках/днях і застосовуються по одному разу.
+    Повертає список результатів по кожній операції.
+    """
+    ids = {op.get('id') for op in operations if isinstance(op, dict)}
+    ids = {i for i in ids if _is_id(i)}
+    targets = {
+        t.id: t for t in Transaction.query.filter(
+            Transaction.user_id == user_id, Transaction.id.in_(ids)
+        )
+    } if ids else {}
+    
+    category_ids = {
+        op['category_id'] for op in operations
+        if isinstance(op, dict) and _is_id(op.get('category_id'))
+    }
+    categories = {
+        category_id for (category_id,) in db.session.query(Category.id).filter(
+            Category.user_id == user_id, Category.id.in_(category_ids)
+        )
+    } if category_ids else set()
+    
+    balance_history.ensure_snapshots({t.account_id for t in targets.values()})
+    
+    totals = _Totals()
+    results = []
+    
+    for index, op in enumerate(operations):
+        if not isinstance(op, dict) or op.get('op') not in ('update', 'delete'):
+            results.append({'index': index, 'status': 'error', 'error': 'Operation must be "update" or "delete"'})
+            continue
+        
+        transaction = targets.get(op['id']) if _is_id(op.get('id')) else None
+        if not transaction:
+            results.append({'index': index, 'id': op.get('id'), 'status': 'error', 'error': 'Transaction not found'})
+            continue
+        
+        if op['op'] == 'delete':
+            totals.add(transaction, -1)
+            db.session.delete(transaction)
+            # Повторна операція з тим самим id отримає "not found"
+            del targets[transaction.id]
+            results.append({'index': index, 'id': transaction.id, 'status': 'deleted'})
+            continue
+        
+        values, error = _validate_update(op, categories)
+        if error:
+            results.append({'index': index, 'id': transaction.id, 'status': 'error', 'error': error})
+            continue
+        
+        totals.add(transaction, -1)
+        for field, value in values.items():
+            setattr(transaction, field, value)
+        totals.add(transaction, 1)
+        results.append({'index': index, 'id': transaction.id, 'status': 'updated'})
+    
+    # По одній атомарній зміні балансу на рахунок і одному upsert на день/категорію
+    for account_id, delta in totals.balances.items():
+        if delta:
+            apply_delta(account_id, delta)
+    
+    for (account_id, period_end), delta in totals.snapshots.items():
+        balance_history.adjust(account_id, period_end, delta)
+    
+    for (day, category_id, transaction_type), (amount, count) in totals.rollups.items():
+        if amount or count:
+            rollups.add_total(user_id, day, category_id, transaction_type, amount, count)
+    
+    if any(result['status'] != 'error' for result in results):
+        bump(user_id)
+    
+    db.session.commit()
+    
+    return results
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import zlib
+
+# Скільки рядків тягнути з серверного курсора за один раз
+EXPORT_BATCH_SIZE = 1000
+
+# Накопичуємо вивід до цього розміру перед відправкою шматка клієнту
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+EXPORT_COLUMNS = (
+    'id', 'date', 'transaction_type', 'amount', 'account_id', 'account_name',
+    'category_id', 'category_name', 'description'
+)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson')
+}
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_FLUSH_BYTES:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    yield ''.join(chunk)
+
+
+def _gzip(chunks):
+    # wbits=31 - формат gzip (заголовок і контрольна сума)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _plain_rows(result):
+    for (row_id, date, transaction_type, amount, account_id, account_name,
+         category_id, category_name, description) in result:
+        yield (
+            row_id,
+            date.strftime('%Y-%m-%d %H:%M:%S') if date else None,
+            transaction_type,
+            str(amount),
+            account_id,
+            account_name,
+            category_id,
+            category_name,
+            description
+        )
+
+
+def stream_export(result, fmt, compress=False):
+    """Генератор шматків експорту. result - ітератор рядків з серверного курсора"""
+    rows = _plain_rows(result)
+    lines = _csv_lines(rows) if fmt == 'csv' else _ndjson_lines(rows)
+    encoded = (chunk.encode('utf-8') for chunk in lines if chunk)
+    return _gzip(encoded) if compress else encoded
@@ -0,0 +1,190 @@
+import csv
+import io
+from app import db
+from app.models import Transaction, Category, Account
+from app.services import rollups
+from app.services.balances import signed_amount, apply_delta
+from app.services import balance_history
+from app.services.etag import bump
+from app.services import analytics_cache
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# Максимальна кількість рядків в одному імпорті
+MAX_IMPORT_ROWS = 50000
+
+# Скільки рядків вставляти і фіксувати (commit) за один раз
+IMPORT_CHUNK_SIZE = 1000
+
+TRANSACTION_TYPES = ('income', 'expense', 'transfer')
+
+# Межі значень: amount - Numeric(15, 2), description - до 255 символів (як опис
+# регулярних транзакцій). Рядок за межами дає помилку цього рядка, а не збій
+# INSERT усієї порції (strict mode MySQL)
+MAX_AMOUNT = Decimal('9999999999999.99')
+MAX_DESCRIPTION_LENGTH = 255
+
+
+def read_rows(req):
+    """Прочитати рядки імпорту з JSON-масиву або CSV (тіло text/csv чи файл 'file').
+    
+    Піднімає ValueError, якщо тіло запиту не вдалося розібрати.
+    """
+    if 'file' in req.files:
+        stream = io.TextIOWrapper(req.files['file'].stream, encoding='utf-8-sig')
+        return list(csv.DictReader(stream))
+    
+    if req.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(req.get_data(as_text=True))))
+    
+    data = req.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('transactions')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of transactions or a CSV file')
+    return data
+
+
+def _validate_row(row, accounts, categories):
+    """Повернути словник для вставки або рядок з помилкою"""
+    if not isinstance(row, dict):
+        return None, 'Row must be an object'
+    
+    if not all(row.get(k) not in (None, '') for k in ('account_id', 'amount', 'transaction_type', 'date')):
+        return None, 'Missing required fields: account_id, amount, transaction_type, date'
+    
+    try:
+        account_id = int(row['account_id'])
+    except (ValueError, TypeError):
+        return None, 'Invalid account_id'
+    if account_id not in accounts:
+        return None, 'Account not found'
+    
+    if row['transaction_type'] not in TRANSACTION_TYPES:
+        return None, 'Transaction type must be "income", "expense", or "transfer"'
+    
+    try:
+        amount = Decimal(str(row['amount']))
+    except InvalidOperation:
+        return None, 'Invalid amount'
+    if not amount.is_finite() or amount <= 0:
+        return None, 'Amount must be greater than zero'
+    if amount > MAX_AMOUNT:
+        return None, 'Amount is too large'
+    
+    description = row.get('description')
+    description = str(description) if description not in (None, '') else ''
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+        return None, f'Description must be at most {MAX_DESCRIPTION_LENGTH} characters'
+    
+    category_id = row.get('category_id')
+    if category_id not in (None, ''):
+        try:
+            category_id = int(category_id)
+        except (ValueError, TypeError):
+            return None, 'Invalid category_id'
+        if category_id not in categories:
+            return None, 'Category not found'
+    else:
+        category_id = None
+    
+    try:
+        date = datetime.strptime(str(row['date']), '%Y-%m-%d')
+    except ValueError:
+        return None, 'Invalid date format. Use YYYY-MM-DD'
+    
+    return {
+        'account_id': account_id,
+        'category_id': category_id,
+        'amount': amount,
+        'transaction_type': row['transaction_type'],
+        'description': description,
+        'date': date
+    }, None
+
+
+def _ids(rows, key):
+    ids = set()
+    for row in rows:
+        if isinstance(row, dict):
+            try:
+                ids.add(int(row.get(key)))
+            except (ValueError, TypeError):
+                pass
+    return ids
+
+
+def import_transactions(user_id, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Імпортувати рядки пакетами: валідація власності один раз на id,
+    пакетна вставка, одне оновлення балансу на рахунок і commit на кожну порцію.
+    
+    Повертає (кількість імпортованих, список помилок по рядках).
+    """
+    # Перевірка власності - один запит на всі рахунки і один на всі категорії
+    account_ids = _ids(rows, 'account_id')
+    accounts = {
+        account_id for (account_id,) in db.session.query(Account.id).filter(
+            Account.user_id == user_id, Account.id.in_(account_ids)
+        )
+    } if account_ids else set()
+    
+    category_ids = _ids(rows, 'category_id')
+    categories = {
+        category_id for (category_id,) in db.session.query(Category.id).filter(
+            Category.user_id == user_id, Category.id.in_(category_ids)
+        )
+    } if category_ids else set()
+    
+    imported = 0
+    errors = []
+    
+    # Спершу валідуються всі рядки: некоректний рядок - це помилка рядка,
+    # а не збій INSERT посеред імпорту, коли частина порцій уже зафіксована
+    valid = []
+    for index, row in enumerate(rows, start=1):
+        values, error = _validate_row(row, accounts, categories)
+        if error:
+            errors.append({'row': index, 'error': error})
+            continue
+        values['user_id'] = user_id
+        valid.append(values)
+    
+    balance_history.ensure_snapshots({values['account_id'] for values in valid})
+    
+    for start in range(0, len(valid), chunk_size):
+        batch = valid[start:start + chunk_size]
+        balance_deltas = defaultdict(Decimal)
+        snapshot_deltas = defaultdict(Decimal)
+        rollup_deltas = defaultdict(lambda: [Decimal('0'), 0])
+        
+        for values in batch:
+            amount = values['amount']
+            effect = signed_amount(values['transaction_type'], amount)
+            balance_deltas[values['account_id']] += effect
+            snapshot_deltas[(values['account_id'], balance_history.month_end(values['date']))] += effect
+            
+            key = (values['date'].date(), values['category_id'], values['transaction_type'])
+            rollup_deltas[key][0] += amount
+            rollup_deltas[key][1] += 1
+        
+        db.session.execute(db.insert(Transaction), batch)
+        
+        # Одна зміна балансу на рахунок за порцію
+        for account_id, delta in balance_deltas.items():
+            if delta:
+                apply_delta(account_id, delta)
+        
+        for (account_id, period_end), delta in snapshot_deltas.items():
+            balance_history.adjust(account_id, period_end, delta)
+        
+        for (day, category_id, transaction_type), (amount, count) in rollup_deltas.items():
+            rollups.add_total(user_id, day, category_id, transaction_type, amount, count)
+        
+        bump(user_id)
+        # Пакетний INSERT оминає події ORM - кеш перезавантажиться з БД
+        analytics_cache.invalidate(user_id)
+        db.session.commit()
+        imported += len(batch)
+    
+    return imported, errors
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Мікробенчмарк серіалізації списку транзакцій (10 000 рядків, без БД)"""
+
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.models import Transaction
+from app.services.serialization import parse_fields, transaction_columns
+
+ROWS = 10000
+REPEAT = 5
+
+
+def make_transactions(count):
+    start = datetime(2024, 1, 1, 9, 30)
+    transactions = []
+    for i in range(count):
+        transactions.append(Transaction(
+            id=i + 1,
+            user_id=1,
+            account_id=1 + i % 3,
+            category_id=1 + i % 12,
+            amount=Decimal('123.45') + i,
+            description=f'Покупка #{i}',
+            transaction_type='expense' if i % 4 else 'income',
+            date=start + timedelta(minutes=i),
+            created_at=start + timedelta(minutes=i, seconds=5)
+        ))
+    return transactions
+
+
+def bench(label, fn):
+    best = min(_timed(fn) for _ in range(REPEAT))
+    print(f'{label:<45} {best * 1000:8.1f} ms')
+    return best
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    transactions = make_transactions(ROWS)
+    # Рядки у тому ж вигляді, який повертає запит з проєкцією колонок
+    rows = [
+        (t.id, t.date, t.id, t.account_id, 'Картка', t.category_id, 'Продукти',
+         t.amount, t.description, t.transaction_type, t.date, t.created_at)
+        for t in transactions
+    ]
+    
+    print(f'{ROWS} транзакцій, найкращий з {REPEAT} запусків\n')
+    
+    baseline = bench('to_dict() + json (старий шлях)', lambda: json.dumps([
+        t.to_dict(account_name='Картка', category_name='Продукти') for t in transactions
+    ], sort_keys=True))
+    
+    _, _, serialize = transaction_columns(None)
+    bench('проєкція колонок + json', lambda: json.dumps(
+        [serialize(row) for row in rows], sort_keys=True
+    ))
+    
+    try:
+        import orjson
+    except ImportError:
+        print('\norjson не встановлено - пропускаємо швидкий бекенд')
+        return
+    
+    fast = bench('проєкція колонок + orjson', lambda: orjson.dumps(
+        [serialize(row) for row in rows], option=orjson.OPT_SORT_KEYS
+    ))
+    
+    fields = parse_fields('id,amount,date', {'id', 'amount', 'date'})
+    sparse_rows = [(t.id, t.date, t.id, t.amount, t.date) for t in transactions]
+    _, _, serialize_sparse = transaction_columns(fields)
+    sparse = bench('fields=id,amount,date + orjson', lambda: orjson.dumps(
+        [serialize_sparse(row) for row in sparse_rows], option=orjson.OPT_SORT_KEYS
+    ))
+    
+    print(f'\nПришвидшення: {baseline / fast:.1f}x (всі поля), {baseline / sparse:.1f}x (fields)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Account, Category
+
+
+@pytest.fixture
+def app(tmp_path):
+    # SQLite у файлі (а не :memory:), щоб паралельні потоки мали окремі з'єднання.
+    # TEST_DATABASE_URL дозволяє прогнати ті самі тести на окремій БД MySQL
+    database_url = os.getenv('TEST_DATABASE_URL') or f"sqlite:///{tmp_path / 'test.db'}"
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}} if database_url.startswith('sqlite') else {},
+        'JWT_SECRET_KEY': 'test-jwt-secret-key-with-enough-length',
+        'EXCHANGE_RATE_PROVIDER': 'static'
+    })
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def serialized_sqlite(app):
+    """Транзакції SQLite одразу беруть блокування запису (BEGIN IMMEDIATE).
+
+    Потрібно для паралельних HTTP-запитів: інакше два записи, що почали з
+    читання, отримують "database is locked" замість того, щоб дочекатися
+    один одного. На інших СУБД нічого не змінює.
+    """
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'sqlite':
+            return
+
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    """Користувач з одним рахунком і категоріями доходу/витрат"""
+    with app.app_context():
+        user = User(username='tester', email='tester@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        account = Account(user_id=user.id, name='Main', balance=100, opening_balance=100)
+        expense = Category(user_id=user.id, name='Food', type='expense')
+        income = Category(user_id=user.id, name='Salary', type='income')
+        db.session.add_all([account, expense, income])
+        db.session.commit()
+        return {
+            'id': user.id,
+            'account_id': account.id,
+            'expense_category_id': expense.id,
+            'income_category_id': income.id,
+            'headers': {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        }
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from app import db
+from app.models import Account, Transaction
+from app.services.balances import apply_delta, signed_amount_sql
+
+WRITERS = 8
+WRITES_PER_WRITER = 25
+
+
+def _ledger_balance(account_id):
+    account = db.session.get(Account, account_id)
+    total = db.session.query(db.func.coalesce(db.func.sum(signed_amount_sql()), 0)) \
+        .filter(Transaction.account_id == account_id).scalar()
+    return Decimal(str(account.opening_balance)) + Decimal(str(total))
+
+
+def test_parallel_writers_keep_balance_equal_to_ledger(app, user, serialized_sqlite):
+    """Багато паралельних записів в один рахунок: баланс == opening_balance + сума транзакцій"""
+    account_id = user['account_id']
+
+    def writer(index):
+        client = app.test_client()
+        for n in range(WRITES_PER_WRITER):
+            is_income = (index + n) % 3 == 0
+            response = client.post('/api/transactions', headers=user['headers'], json={
+                'account_id': account_id,
+                'category_id': user['income_category_id'] if is_income else user['expense_category_id'],
+                'amount': f'{n + 1}.{index:02d}',
+                'transaction_type': 'income' if is_income else 'expense',
+                'date': f'2025-01-{n % 28 + 1:02d}'
+            })
+            assert response.status_code == 201, response.get_json()
+
+            # Частину записів одразу видаляємо - зворотна зміна балансу теж атомарна
+            if n % 5 == 0:
+                transaction_id = response.get_json()['transaction']['id']
+                response = client.delete(f'/api/transactions/{transaction_id}', headers=user['headers'])
+                assert response.status_code == 200, response.get_json()
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        list(pool.map(writer, range(WRITERS)))
+
+    with app.app_context():
+        count = Transaction.query.filter_by(account_id=account_id).count()
+        assert count == WRITERS * (WRITES_PER_WRITER - WRITES_PER_WRITER // 5)
+        balance = Decimal(str(db.session.get(Account, account_id).balance))
+        assert balance == _ledger_balance(account_id)
+
+
+def test_parallel_apply_delta_loses_no_updates(app, user):
+    """Паралельні apply_delta без серіалізації транзакцій: жодне оновлення не губиться"""
+    account_id = user['account_id']
+
+    def writer(index):
+        with app.app_context():
+            for _ in range(WRITES_PER_WRITER):
+                apply_delta(account_id, Decimal('1.25') if index % 2 else Decimal('-0.75'))
+                db.session.commit()
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        list(pool.map(writer, range(WRITERS)))
+
+    with app.app_context():
+        expected = Decimal('100') + WRITES_PER_WRITER * (WRITERS // 2) * (Decimal('1.25') - Decimal('0.75'))
+        assert Decimal(str(db.session.get(Account, account_id).balance)) == expected
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models import Transaction
+
+
+@contextmanager
+def count_statements(app):
+    """Порахувати SQL-запити, виконані всередині блоку"""
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _count)
+
+
+def _add_transactions(app, user, count):
+    with app.app_context():
+        start = datetime(2025, 1, 1)
+        db.session.add_all([
+            Transaction(
+                user_id=user['id'],
+                account_id=user['account_id'],
+                category_id=user['expense_category_id'] if n % 2 else user['income_category_id'],
+                amount=10 + n,
+                description=f'Transaction {n}',
+                transaction_type='expense' if n % 2 else 'income',
+                date=start + timedelta(days=n)
+            )
+            for n in range(count)
+        ])
+        db.session.commit()
+
+
+def _list_statements(app, client, user):
+    with count_statements(app) as statements:
+        response = client.get('/api/transactions?limit=100', headers=user['headers'])
+    assert response.status_code == 200
+    return len(response.get_json()['transactions']), len(statements)
+
+
+def test_transaction_list_query_count_does_not_grow_with_rows(app, client, user):
+    """Назви рахунку й категорії вибираються тим самим запитом - без N+1"""
+    _add_transactions(app, user, 5)
+    rows, few_rows_statements = _list_statements(app, client, user)
+    assert rows == 5
+
+    _add_transactions(app, user, 55)
+    rows, many_rows_statements = _list_statements(app, client, user)
+    assert rows == 60
+
+    assert many_rows_statements == few_rows_statements
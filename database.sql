@@ -38,6 +38,10 @@ CREATE TABLE `users` (
 -- ============================================================================
 -- TABLE: accounts
 -- Stores user financial accounts (bank cards, cash, etc.)
+-- `balance` must equal `opening_balance` plus the signed sum of the account's
+-- transactions; `flask reconcile-balances` checks this. Existing databases need:
+--   ALTER TABLE `accounts` ADD COLUMN `opening_balance` DECIMAL(15,2) NOT NULL DEFAULT 0.00 AFTER `balance`;
+-- followed by the opening balance backfill below
 -- ============================================================================
 DROP TABLE IF EXISTS `accounts`;
 CREATE TABLE `accounts` (
@@ -45,6 +49,7 @@ CREATE TABLE `accounts` (
   `user_id` INT NOT NULL,
   `name` VARCHAR(50) NOT NULL,
   `balance` DECIMAL(15,2) DEFAULT 0.00,
+  `opening_balance` DECIMAL(15,2) NOT NULL DEFAULT 0.00,
   `currency` VARCHAR(3) DEFAULT 'UAH',
   `is_active` TINYINT(1) DEFAULT 1,
   `created_at` TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
@@ -100,6 +105,7 @@ CREATE TABLE `transactions` (
   KEY `idx_date` (`date`),
   KEY `idx_user_date` (`user_id`, `date`),
   KEY `idx_user_type_date` (`user_id`, `transaction_type`, `date`),
+  FULLTEXT KEY `ft_description` (`description`),
   CONSTRAINT `fk_transactions_user` 
     FOREIGN KEY (`user_id`) 
     REFERENCES `users` (`id`) 
@@ -117,6 +123,13 @@ CREATE TABLE `transactions` (
 -- ============================================================================
 -- TABLE: budgets
 -- Stores budget limits for categories over specific time periods
+-- `spent` is maintained by the application on every transaction write.
+-- Existing databases need:
+--   ALTER TABLE `budgets` ADD COLUMN `spent` DECIMAL(15,2) NOT NULL DEFAULT 0.00 AFTER `end_date`;
+-- followed by `flask verify-budget-spend --fix` to fill it in
+-- `is_recurring` budgets are renewed by `flask rollover-budgets`; existing
+-- databases need:
+--   ALTER TABLE `budgets` ADD COLUMN `is_recurring` TINYINT(1) NOT NULL DEFAULT 0 AFTER `spent`;
 -- ============================================================================
 DROP TABLE IF EXISTS `budgets`;
 CREATE TABLE `budgets` (
@@ -126,12 +139,15 @@ CREATE TABLE `budgets` (
   `amount` DECIMAL(15,2) NOT NULL,
   `start_date` DATE NOT NULL,
   `end_date` DATE NOT NULL,
+  `spent` DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+  `is_recurring` TINYINT(1) NOT NULL DEFAULT 0,
   `created_at` TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   KEY `idx_user_id` (`user_id`),
   KEY `idx_category_id` (`category_id`),
   KEY `idx_dates` (`start_date`, `end_date`),
   KEY `idx_user_dates` (`user_id`, `start_date`, `end_date`),
+  KEY `idx_recurring_end` (`is_recurring`, `end_date`),
   CONSTRAINT `fk_budgets_user` 
     FOREIGN KEY (`user_id`) 
     REFERENCES `users` (`id`) 
@@ -142,6 +158,188 @@ CREATE TABLE `budgets` (
     ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+-- ============================================================================
+-- TABLE: budget_forecasts
+-- End-of-period spend projections written nightly by `flask forecast-budgets`
+-- ============================================================================
+DROP TABLE IF EXISTS `budget_forecasts`;
+CREATE TABLE `budget_forecasts` (
+  `budget_id` INT NOT NULL,
+  `computed_on` DATE NOT NULL,
+  `data_version` BIGINT NOT NULL,
+  `spent` DECIMAL(15,2) NOT NULL,
+  `daily_rate` DECIMAL(15,2) NOT NULL,
+  `projected_linear` DECIMAL(15,2) NOT NULL,
+  `projected_spend` DECIMAL(15,2) NOT NULL,
+  `overrun_probability` DOUBLE NOT NULL,
+  `days_elapsed` INT NOT NULL,
+  `days_remaining` INT NOT NULL,
+  PRIMARY KEY (`budget_id`),
+  CONSTRAINT `fk_budget_forecasts_budget` 
+    FOREIGN KEY (`budget_id`) 
+    REFERENCES `budgets` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: budget_alert_rules
+-- Percent thresholds per budget; is_triggered remembers whether spend is
+-- currently above the threshold so only crossings produce notifications
+-- ============================================================================
+DROP TABLE IF EXISTS `budget_alert_rules`;
+CREATE TABLE `budget_alert_rules` (
+  `budget_id` INT NOT NULL,
+  `threshold_percent` SMALLINT NOT NULL,
+  `is_triggered` TINYINT(1) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`budget_id`, `threshold_percent`),
+  CONSTRAINT `fk_budget_alert_rules_budget` 
+    FOREIGN KEY (`budget_id`) 
+    REFERENCES `budgets` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: notifications
+-- User notifications; pending rows are the delivery queue drained by
+-- `flask drain-notifications`
+-- ============================================================================
+DROP TABLE IF EXISTS `notifications`;
+CREATE TABLE `notifications` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `user_id` INT NOT NULL,
+  `budget_id` INT DEFAULT NULL,
+  `kind` VARCHAR(50) NOT NULL,
+  `message` VARCHAR(255) NOT NULL,
+  `payload` TEXT DEFAULT NULL,
+  `status` ENUM('pending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `available_at` DATETIME NOT NULL,
+  `created_at` DATETIME DEFAULT NULL,
+  `sent_at` DATETIME DEFAULT NULL,
+  `read_at` DATETIME DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_notifications_queue` (`status`, `available_at`),
+  KEY `idx_notifications_user` (`user_id`, `created_at`),
+  CONSTRAINT `fk_notifications_user` 
+    FOREIGN KEY (`user_id`) 
+    REFERENCES `users` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_notifications_budget` 
+    FOREIGN KEY (`budget_id`) 
+    REFERENCES `budgets` (`id`) 
+    ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: recurring_transactions
+-- Templates for repeating transactions (rent, salary) materialized daily by
+-- `flask run-recurring`
+-- ============================================================================
+DROP TABLE IF EXISTS `recurring_transactions`;
+CREATE TABLE `recurring_transactions` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `user_id` INT NOT NULL,
+  `account_id` INT NOT NULL,
+  `category_id` INT DEFAULT NULL,
+  `amount` DECIMAL(15,2) NOT NULL,
+  `description` VARCHAR(255) DEFAULT NULL,
+  `transaction_type` ENUM('income', 'expense', 'transfer') NOT NULL,
+  `interval_unit` ENUM('day', 'week', 'month', 'year') NOT NULL DEFAULT 'month',
+  `interval_count` INT NOT NULL DEFAULT 1,
+  `start_date` DATE NOT NULL,
+  `end_date` DATE DEFAULT NULL,
+  `next_run` DATE NOT NULL,
+  `is_active` TINYINT(1) NOT NULL DEFAULT 1,
+  `created_at` TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_recurring_due` (`is_active`, `next_run`),
+  CONSTRAINT `fk_recurring_transactions_user` 
+    FOREIGN KEY (`user_id`) 
+    REFERENCES `users` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_recurring_transactions_account` 
+    FOREIGN KEY (`account_id`) 
+    REFERENCES `accounts` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_recurring_transactions_category` 
+    FOREIGN KEY (`category_id`) 
+    REFERENCES `categories` (`id`) 
+    ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: daily_category_totals
+-- Daily per-user rollup of transaction totals by category and type.
+-- Maintained on every transaction write; rebuild with `flask rebuild-rollups`
+-- ============================================================================
+DROP TABLE IF EXISTS `daily_category_totals`;
+CREATE TABLE `daily_category_totals` (
+  `user_id` INT NOT NULL,
+  `day` DATE NOT NULL,
+  `category_id` INT NOT NULL DEFAULT 0,
+  `transaction_type` ENUM('income', 'expense', 'transfer') NOT NULL,
+  `total` DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+  `count` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`, `day`, `category_id`, `transaction_type`),
+  KEY `idx_user_category_day` (`user_id`, `category_id`, `transaction_type`, `day`),
+  CONSTRAINT `fk_daily_category_totals_user` 
+    FOREIGN KEY (`user_id`) 
+    REFERENCES `users` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: account_balance_snapshots
+-- Month-end cumulative ledger movement per account (income - expense) used to
+-- bound balance history queries. Refresh monthly with `flask snapshot-balances`
+-- ============================================================================
+DROP TABLE IF EXISTS `account_balance_snapshots`;
+CREATE TABLE `account_balance_snapshots` (
+  `account_id` INT NOT NULL,
+  `period_end` DATE NOT NULL,
+  `ledger_total` DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+  PRIMARY KEY (`account_id`, `period_end`),
+  CONSTRAINT `fk_account_balance_snapshots_account` 
+    FOREIGN KEY (`account_id`) 
+    REFERENCES `accounts` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: user_data_versions
+-- Per-user data version bumped by every write; used as the ETag of list endpoints
+-- ============================================================================
+DROP TABLE IF EXISTS `user_data_versions`;
+CREATE TABLE `user_data_versions` (
+  `user_id` INT NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`),
+  CONSTRAINT `fk_user_data_versions_user` 
+    FOREIGN KEY (`user_id`) 
+    REFERENCES `users` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================================
+-- TABLE: idempotency_keys
+-- Stored responses of create requests sent with an Idempotency-Key header
+-- ============================================================================
+DROP TABLE IF EXISTS `idempotency_keys`;
+CREATE TABLE `idempotency_keys` (
+  `user_id` INT NOT NULL,
+  `key` VARCHAR(255) NOT NULL,
+  `request_hash` CHAR(64) NOT NULL,
+  `status_code` SMALLINT DEFAULT NULL,
+  `response_body` LONGTEXT DEFAULT NULL,
+  `expires_at` DATETIME NOT NULL,
+  PRIMARY KEY (`user_id`, `key`),
+  KEY `ix_idempotency_keys_expires_at` (`expires_at`),
+  CONSTRAINT `fk_idempotency_keys_user` 
+    FOREIGN KEY (`user_id`) 
+    REFERENCES `users` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 -- ============================================================================
 -- TABLE: admin_logs
 -- Stores admin activity logs for audit purposes
@@ -324,6 +522,23 @@ INSERT INTO `transactions` (`id`, `user_id`, `account_id`, `category_id`, `amoun
 (34, 1, 3, NULL, 1500.00, 'transfer', 'Переказ на готівку', '2025-09-10 13:45:00', '2025-10-06 13:20:59'),
 (35, 1, 1, NULL, 1500.00, 'transfer', 'Отримано з карти Монобанк', '2025-09-10 13:45:01', '2025-10-06 13:20:59');
 
+-- Opening balances: the seeded balances already include the seeded transactions
+UPDATE `accounts` a
+SET a.`opening_balance` = a.`balance` - (
+  SELECT COALESCE(SUM(CASE t.`transaction_type`
+    WHEN 'income' THEN t.`amount`
+    WHEN 'expense' THEN -t.`amount`
+    ELSE 0 END), 0)
+  FROM `transactions` t
+  WHERE t.`account_id` = a.`id`
+);
+
+-- Backfill daily rollups for the seeded transactions
+INSERT INTO `daily_category_totals` (`user_id`, `day`, `category_id`, `transaction_type`, `total`, `count`)
+SELECT `user_id`, DATE(`date`), COALESCE(`category_id`, 0), `transaction_type`, SUM(`amount`), COUNT(*)
+FROM `transactions`
+GROUP BY `user_id`, DATE(`date`), COALESCE(`category_id`, 0), `transaction_type`;
+
 -- Insert test budgets
 INSERT INTO `budgets` (`id`, `user_id`, `category_id`, `amount`, `start_date`, `end_date`, `created_at`) VALUES
 (1, 1, 6, 5000.00, '2025-10-01', '2025-10-31', '2025-10-06 13:20:59'),
@@ -332,6 +547,23 @@ INSERT INTO `budgets` (`id`, `user_id`, `category_id`, `amount`, `start_date`, `
 (4, 1, 12, 8000.00, '2025-10-01', '2025-10-31', '2025-10-06 13:20:59'),
 (5, 1, 13, 2000.00, '2025-10-01', '2025-10-31', '2025-10-06 13:20:59');
 
+-- Fill budget spend counters from the seeded transactions
+UPDATE `budgets` b
+SET b.`spent` = (
+  SELECT COALESCE(SUM(t.`amount`), 0)
+  FROM `transactions` t
+  WHERE t.`user_id` = b.`user_id`
+    AND t.`category_id` = b.`category_id`
+    AND t.`transaction_type` = 'expense'
+    AND DATE(t.`date`) BETWEEN b.`start_date` AND b.`end_date`
+);
+
+-- Default 80% / 100% alerts for the seeded budgets (already crossed ones start triggered)
+INSERT INTO `budget_alert_rules` (`budget_id`, `threshold_percent`, `is_triggered`)
+SELECT b.`id`, th.`pct`, b.`spent` >= b.`amount` * th.`pct` / 100
+FROM `budgets` b
+CROSS JOIN (SELECT 80 AS `pct` UNION ALL SELECT 100) th;
+
 -- ============================================================================
 -- VERIFICATION QUERIES
 -- ============================================================================
@@ -1,9 +1,10 @@
 import { useState, useEffect } from 'react'
-import { getAccounts, deleteAccount } from '../../services/accounts'
+import { getAccounts, deleteAccount, getNetWorth } from '../../services/accounts'
 import AccountForm from './AccountForm'
 
 const AccountList = () => {
   const [accounts, setAccounts] = useState([])
+  const [netWorth, setNetWorth] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [showForm, setShowForm] = useState(false)
@@ -16,8 +17,10 @@ const AccountList = () => {
   const loadAccounts = async () => {
     try {
       setLoading(true)
-      const data = await getAccounts()
+      // Загальний баланс рахує сервер з конвертацією валют за курсами
+      const [data, netWorthData] = await Promise.all([getAccounts(), getNetWorth('UAH')])
       setAccounts(data)
+      setNetWorth(netWorthData)
       setError('')
     } catch (err) {
       setError(err.toString())
@@ -58,10 +61,6 @@ const AccountList = () => {
     setEditingAccount(null)
   }
 
-  const getTotalBalance = () => {
-    return accounts.reduce((sum, acc) => sum + parseFloat(acc.balance), 0)
-  }
-
   const getCurrencySymbol = (currency) => {
     const symbols = {
       'UAH': '₴',
@@ -116,10 +115,11 @@ const AccountList = () => {
       <div className="card bg-gradient-to-r from-primary-500 to-primary-600 text-white">
         <h2 className="text-lg font-semibold mb-2">Загальний баланс</h2>
         <p className="text-3xl font-bold">
-          {getTotalBalance().toFixed(2)} ₴
+          {(netWorth?.total ?? 0).toFixed(2)} ₴
         </p>
         <p className="text-sm opacity-90 mt-1">
           По всіх активних рахунках
+          {netWorth?.unconverted?.length > 0 && ` (без ${netWorth.unconverted.join(', ')} - немає курсу)`}
         </p>
       </div>
 
@@ -6,6 +6,8 @@ import TransactionForm from './TransactionForm'
 
 const TransactionList = () => {
   const [transactions, setTransactions] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [categories, setCategories] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
@@ -23,8 +25,10 @@ const TransactionList = () => {
       try {
         setLoading(true)
         
+        // Лише перша сторінка; решта - за кнопкою "Завантажити ще"
         const transactionsData = await getTransactions(filters)
-        setTransactions(transactionsData)
+        setTransactions(transactionsData.transactions)
+        setNextCursor(transactionsData.next_cursor)
         
         const allCategories = await getCategories()
         setCategories(allCategories)
@@ -38,6 +42,19 @@ const TransactionList = () => {
     fetchData()
   }, [filters])
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true)
+      const transactionsData = await getTransactions(filters, nextCursor)
+      setTransactions([...transactions, ...transactionsData.transactions])
+      setNextCursor(transactionsData.next_cursor)
+    } catch (err) {
+      setError(err.toString())
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleFilterChange = (e) => {
     const { name, value } = e.target
     setFilters({ ...filters, [name]: value })
@@ -290,6 +307,18 @@ const TransactionList = () => {
               ))}
             </tbody>
           </table>
+          
+          {nextCursor && (
+            <div className="mt-4 flex justify-center">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="btn btn-secondary"
+              >
+                {loadingMore ? 'Завантаження...' : 'Завантажити ще'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
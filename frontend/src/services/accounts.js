@@ -49,4 +49,13 @@ export const getAccount = async (id) => {
   } catch (error) {
     throw error.response?.data?.error || 'Failed to fetch account'
   }
-}
\ No newline at end of file
+}
+// Загальна вартість активних рахунків в одній валюті
+export const getNetWorth = async (currency = 'UAH') => {
+  try {
+    const response = await api.get('/accounts/net-worth', { params: { currency } })
+    return response.data
+  } catch (error) {
+    throw error.response?.data?.error || 'Failed to fetch net worth'
+  }
+}
@@ -1,10 +1,14 @@
 import api from './api'
 
-// Отримання списку транзакцій
-export const getTransactions = async (filters = {}) => {
+// Отримання однієї сторінки транзакцій; наступна - за next_cursor
+export const getTransactions = async (filters = {}, cursor = null) => {
   try {
-    const response = await api.get('/transactions', { params: filters })
-    return response.data.transactions
+    const params = cursor ? { ...filters, cursor } : filters
+    const response = await api.get('/transactions', { params })
+    return {
+      transactions: response.data.transactions,
+      next_cursor: response.data.next_cursor
+    }
   } catch (error) {
     throw error.response?.data?.error || 'Failed to fetch transactions'
   }